@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
-import json
 import os
 import time
 import random
 import string
 import secrets
 import hashlib
-from PIL import Image
+import requests
+from requests.adapters import HTTPAdapter
+from data_loader import load_processed, datasets
+from filter_index import RESTAURANT_COLUMNS, RestaurantFilter
+from storage import open_backend, JournaledBackend
+from image_cache import ImageCache
 
 # File paths
 DATA_FOLDER = "data/"
@@ -17,10 +21,43 @@ DATA_FILES = {
     "USER_PROFILES_FILE": os.path.join(DATA_FOLDER,"user_profiles.json"),
     "REVIEWS_FILE":os.path.join(DATA_FOLDER ,"restaurant_reviews.json")
 }
-
-# Load data
-user_df = pd.read_csv(os.path.join(DATA_FOLDER, "userprofile.csv"))
-restaurant_df = pd.read_csv(os.path.join(DATA_FOLDER, "processed_data.csv"), low_memory=False)
+# SQLite database the JSON files are migrated into (see storage.py)
+STORAGE_DB = os.path.join(DATA_FOLDER, "user_data.sqlite3")
+# Write-behind journal of bookmark and review saves
+STORAGE_JOURNAL = os.path.join(DATA_FOLDER, "user_data.journal")
+
+# Cuisine images and their resized copies (see image_cache.py)
+IMAGE_FOLDER = "restaurant_images"
+THUMBNAIL_FOLDER = "thumbnail_cache"
+
+# Result cards rendered per page of recommendations
+CARDS_PER_PAGE = 6
+
+# Optional recommendation service (see service.py); when unset, or unreachable,
+# the app filters in-process
+SERVICE_URL = os.environ.get("RECOMMENDER_SERVICE_URL")
+SERVICE_TIMEOUT = 10
+SERVICE_CONNECTIONS = 8
+
+# Load data once per process; reruns reuse it until the files change
+datasets.register("users", os.path.join(DATA_FOLDER, "userprofile.csv"), pd.read_csv)
+datasets.register("restaurants", os.path.join(DATA_FOLDER, "processed_data.csv"),
+                  lambda path: load_processed(path, RESTAURANT_COLUMNS))
+user_df = datasets.get("users")
+restaurant_df = datasets.get("restaurants")
+
+@st.cache_resource
+def get_restaurant_filter(version):
+    # Filter bitmaps over the restaurant rows plus a haversine ball tree over one
+    # row per restaurant, rebuilt when the restaurant data changes (`version` is
+    # its content hash); the recommendation service filters with the same class
+    return RestaurantFilter(restaurant_df)
+
+@st.cache_resource
+def get_image_cache():
+    # Cuisine -> thumbnail manifest, scanned once per process; missing
+    # thumbnails are generated on the first run
+    return ImageCache(IMAGE_FOLDER, THUMBNAIL_FOLDER).build()
 
 # Initialize session state
 def init_session_state():
@@ -36,34 +73,38 @@ def init_session_state():
         st.session_state.show_restaurants = False
     if "generated_password" not in st.session_state:
         st.session_state.generated_password = ""
+    if "results_page" not in st.session_state:
+        st.session_state.results_page = 0
 
-# File operations
-def init_files():
-    # Initialize json files if they don't exist
-    for file_key, file_path in DATA_FILES.items():
-        if not os.path.exists(file_path):
-            initial_data = {}
-            
-            # Special handling for default user data
-            if file_key == "PASSWORDS_FILE":
-                for user_id in user_df['userID'].values:
-                    initial_data[user_id] = hashlib.sha256(user_id.encode()).hexdigest()
-            elif file_key == "USER_PROFILES_FILE":
-                for user_id in user_df['userID'].values:
-                    initial_data[user_id] = {
-                        "full_name": "", "email": "", "phone": "", "address": ""
-                    }
-            
-            with open(file_path, "w") as f:
-                json.dump(initial_data, f)
+# Storage backend for bookmarks, reviews, profiles and passwords
+@st.cache_resource
+def get_backend():
+    # Opened once per process; the first run migrates the JSON files into SQLite.
+    # Bookmark and review saves return at once and are journaled in the background.
+    backend = open_backend(DATA_FILES, STORAGE_DB, default_users=user_df['userID'].values)
+    return JournaledBackend(backend, STORAGE_JOURNAL)
+
+# Per-user accessors
+def get_user_bookmarks(username):
+    return get_backend().bookmarks(username)
+
+def add_user_bookmark(username, restaurant_name):
+    get_backend().add_bookmark(username, restaurant_name)
 
-def load_data(file_path):
-    with open(file_path, "r") as f:
-        return json.load(f)
+def remove_user_bookmark(username, restaurant_name):
+    get_backend().remove_bookmark(username, restaurant_name)
 
-def save_data(data, file_path):
-    with open(file_path, "w") as f:
-        json.dump(data, f)
+def get_password_hash(username):
+    return get_backend().password_hash(username)
+
+def set_password_hash(username, hashed):
+    get_backend().set_password_hash(username, hashed)
+
+def get_user_profile(username):
+    return get_backend().profile(username)
+
+def set_user_profile(username, profile):
+    get_backend().save_profile(username, profile)
 
 # Helper functions
 def generate_password(length=12):
@@ -84,45 +125,22 @@ def display_star_rating(rating):
     
     return stars_html
 
-def is_open_in_time_slot(hours_str, time_range):
-    if pd.isna(hours_str):
-        return False
-    for part in str(hours_str).split(';'):
-        part = part.strip()
-        if not part:
-            continue
-        try:
-            open_time, close_time = part.split('-')
-            open_hour = int(open_time.split(':')[0])
-            close_hour = int(close_time.split(':')[0])
-            # Handle overnight (close_hour < open_hour)
-            if close_hour < open_hour:
-                close_hour += 24
-            # Check for overlap
-            slot_start, slot_end = time_range
-            for h in range(open_hour, close_hour):
-                if slot_start <= h < slot_end:
-                    return True
-        except Exception:
-            continue
-    return False
+def get_user_location(username):
+    user = user_df[user_df['userID'] == username]
+    if user.empty or pd.isna(user.iloc[0]['latitude']) or pd.isna(user.iloc[0]['longitude']):
+        return None
+    return float(user.iloc[0]['latitude']), float(user.iloc[0]['longitude'])
 
 # User management functions
 def get_user_reviews(username):
-    reviews = load_data(DATA_FILES["REVIEWS_FILE"])
-    return reviews.get(username, {})
+    return get_backend().reviews(username)
 
 def save_user_review(username, restaurant_name, review_text, rating):
-    reviews = load_data(DATA_FILES["REVIEWS_FILE"])
-    if username not in reviews:
-        reviews[username] = {}
-    
-    reviews[username][restaurant_name] = {
+    get_backend().save_review(username, restaurant_name, {
         "text": review_text,
         "rating": rating,
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-    }
-    save_data(reviews, DATA_FILES["REVIEWS_FILE"])
+    })
 
 # UI Components
 def welcome_screen():
@@ -148,10 +166,9 @@ def welcome_screen():
         with login_col1:
             if st.button("Login"):
                 if username_input in user_df['userID'].values:
-                    passwords = load_data(DATA_FILES["PASSWORDS_FILE"])
                     hashed_input = hashlib.sha256(password_input.encode()).hexdigest()
                     
-                    if hashed_input == passwords.get(username_input, ""):
+                    if hashed_input == get_password_hash(username_input):
                         st.session_state.logged_in = True
                         st.session_state.username = username_input
                         st.session_state.show_profile = False
@@ -189,22 +206,17 @@ def welcome_screen():
         display_random_restaurant_images()
 
 def display_random_restaurant_images():
-    image_folder = "restaurant_images"
-    if os.path.exists(image_folder):
-        cuisine_folders = [f for f in os.listdir(image_folder) if os.path.isdir(os.path.join(image_folder, f))]
+    images = get_image_cache()
+    cuisines = images.cuisines()
+    
+    if cuisines:
+        grid1, grid2 = st.columns(2)
+        cols = [grid1, grid2, grid1, grid2]
         
-        if cuisine_folders:
-            grid1, grid2 = st.columns(2)
-            cols = [grid1, grid2, grid1, grid2]
-            
-            for i in range(4):
-                with cols[i]:
-                    cuisine = random.choice(cuisine_folders)
-                    cuisine_path = os.path.join(image_folder, cuisine)
-                    image_files = [f for f in os.listdir(cuisine_path) if f.endswith(('.jpg', '.png', '.jpeg'))]
-                    if image_files:
-                        img_path = os.path.join(cuisine_path, random.choice(image_files))
-                        st.image(Image.open(img_path), use_container_width=True)
+        for i in range(4):
+            with cols[i]:
+                cuisine = random.choice(cuisines)
+                st.image(random.choice(images.thumbnails(cuisine)), use_container_width=True)
 
 def display_user_profile():
     user_data = user_df[user_df['userID'] == st.session_state.username].iloc[0]
@@ -215,10 +227,7 @@ def display_user_profile():
     with profile_tab:
         st.header(f"👤 {st.session_state.username}'s Profile")
         
-        profiles = load_data(DATA_FILES["USER_PROFILES_FILE"])
-        user_profile = profiles.get(st.session_state.username, {
-            "full_name": "", "email": "", "phone": "", "address": ""
-        })
+        user_profile = get_user_profile(st.session_state.username)
         
         col1, col2 = st.columns(2)
         
@@ -238,11 +247,10 @@ def display_user_profile():
                 address = st.text_area("Address", value=user_profile.get("address", ""))
                 
                 if st.form_submit_button("Save Profile Changes"):
-                    profiles[st.session_state.username] = {
+                    set_user_profile(st.session_state.username, {
                         "full_name": full_name, "email": email, 
                         "phone": phone, "address": address
-                    }
-                    save_data(profiles, DATA_FILES["USER_PROFILES_FILE"])
+                    })
                     st.success("Profile updated successfully!")
         
         with col2:
@@ -284,10 +292,9 @@ def display_account_settings():
         
         if st.form_submit_button("Update Password"):
             # Validate password change
-            passwords = load_data(DATA_FILES["PASSWORDS_FILE"])
             hashed_current = hashlib.sha256(current_password.encode()).hexdigest()
             
-            if hashed_current != passwords.get(st.session_state.username, ""):
+            if hashed_current != get_password_hash(st.session_state.username):
                 st.error("Current password is incorrect.")
             elif new_password != confirm_password:
                 st.error("New passwords don't match.")
@@ -296,15 +303,13 @@ def display_account_settings():
             else:
                 # Update password
                 hashed_new = hashlib.sha256(new_password.encode()).hexdigest()
-                passwords[st.session_state.username] = hashed_new
-                save_data(passwords, DATA_FILES["PASSWORDS_FILE"])
+                set_password_hash(st.session_state.username, hashed_new)
                 st.success("Password changed successfully!")
 
 def display_bookmarks():
     st.header("🔖 Your Bookmarked Restaurants")
     
-    bookmarks = load_data(DATA_FILES["BOOKMARK_FILE"])
-    user_bookmarks = bookmarks.get(st.session_state.username, [])
+    user_bookmarks = get_user_bookmarks(st.session_state.username)
     
     if not user_bookmarks:
         st.info("You haven't bookmarked any restaurants yet.")
@@ -327,9 +332,7 @@ def display_bookmarks():
                 
                 # Use name as part of the key for uniqueness
                 if st.button(f"❌ Remove", key=f"remove_bookmark_{name}_{i}"):
-                    user_bookmarks.remove(name)
-                    bookmarks[st.session_state.username] = user_bookmarks
-                    save_data(bookmarks, DATA_FILES["BOOKMARK_FILE"])
+                    remove_user_bookmark(st.session_state.username, name)
                     st.success(f"Removed {name} from bookmarks!")
                     st.experimental_rerun()
             else:
@@ -356,7 +359,10 @@ def display_visited_places(user_data):
         
         # Show nearby restaurants
         st.subheader("Restaurants Near You")
-        nearby = restaurant_df[restaurant_df['distance_km'] < 5].head(5)
+        restaurant_filter = get_restaurant_filter(datasets.version("restaurants"))
+        positions, distances = restaurant_filter.spatial.query_nearest(user_data['latitude'], user_data['longitude'], 5)
+        nearby = restaurant_filter.restaurants.iloc[positions].assign(distance_km=distances)
+        nearby = nearby[nearby['distance_km'] < 5]
         
         if not nearby.empty:
             for idx, row in nearby.iterrows():
@@ -370,33 +376,49 @@ def display_visited_places(user_data):
     else:
         st.info("Location information not available.")
 
-def display_restaurant_recommendations(filters):
-    filtered = restaurant_df.copy()
-
-    # Apply cuisine filter
-    if filters["cuisine"] != "Any":
-        filtered = filtered[filtered['Rcuisine_x'] == filters["cuisine"]]
-
-    # Apply other filters
-    filtered = filtered[filtered['group_friendly_score'] >= filters["group_score"]]
-    filtered = filtered[filtered['distance_km'] <= filters["distance"]]
-    filtered = filtered[filtered['avg_rating'] >= filters["min_rating"]]
-
-    # Apply day filter
-    if filters["day"] != "Any":
-        day_column = filters["days_options"][filters["day"]]
-        if day_column in filtered.columns:
-            filtered = filtered[filtered[day_column] == 1]
+def filter_restaurants(filters, location):
+    # Every filter is a bitmap from the filter index; only the top rows are materialized.
+    # Distances are measured from the user's own location when known.
+    return get_restaurant_filter(datasets.version("restaurants")).select(
+        filters["num_recs"], location=location, max_distance=filters["distance"], cuisine=filters["cuisine"],
+        min_group_score=filters["group_score"], min_rating=filters["min_rating"],
+        days=filters["days_options"][filters["day"]], hours=filters["time_slots"][filters["time_slot"]]
+    )
 
-    # Apply time filter
-    if filters["time_slot"] != "Any":
-        filtered = filtered[filtered['hours'].apply(lambda x: is_open_in_time_slot(x, filters["time_slots"][filters["time_slot"]]))]
+@st.cache_resource
+def get_service_session():
+    # One HTTP session shared by every script run, keeping at most
+    # SERVICE_CONNECTIONS keep-alive connections to the service; runs beyond
+    # that wait for a free connection instead of opening new ones
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SERVICE_CONNECTIONS, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_restaurants(filters, location):
+    # The same filtering done by the recommendation service
+    response = get_service_session().post(f"{SERVICE_URL.rstrip('/')}/filter", json={
+        "top_n": filters["num_recs"], "cuisine": filters["cuisine"], "max_distance": filters["distance"],
+        "min_group_score": filters["group_score"], "min_rating": filters["min_rating"],
+        "days": filters["days_options"][filters["day"]], "hours": filters["time_slots"][filters["time_slot"]],
+        "location": location
+    }, timeout=SERVICE_TIMEOUT)
+    response.raise_for_status()
+    return pd.DataFrame(response.json()["results"])
 
-    # Get top recommendations
-    filtered = filtered.sort_values('avg_rating', ascending=False).head(filters["num_recs"])
+def display_restaurant_recommendations(filters):
+    location = get_user_location(st.session_state.username)
+    filtered = None
+    if SERVICE_URL:
+        try:
+            filtered = fetch_restaurants(filters, location)
+        except requests.RequestException:
+            filtered = None
+    if filtered is None:
+        filtered = filter_restaurants(filters, location)
 
-    bookmarks = load_data(DATA_FILES["BOOKMARK_FILE"])
-    user_bookmarks = bookmarks.get(st.session_state.username, [])
+    user_bookmarks = get_user_bookmarks(st.session_state.username)
 
     if filtered.empty:
         st.warning("No restaurants match your criteria. Please try adjusting your filters.")
@@ -404,32 +426,78 @@ def display_restaurant_recommendations(filters):
     
     st.subheader("🍽️ Recommended Restaurants")
     
+    # Only the current page of cards is rendered on each rerun
+    rows = filtered.to_dict('records')
+    start = results_page(rows) * CARDS_PER_PAGE
+    user_reviews = get_user_reviews(st.session_state.username)
+    
     # Display restaurants in 2 columns
     col1, col2 = st.columns(2)
     
-    for i, row in enumerate(filtered.to_dict('records')):
+    for i, row in enumerate(rows[start:start + CARDS_PER_PAGE], start):
         with col1 if i % 2 == 0 else col2:
-            display_restaurant_card(row, user_bookmarks, i)
+            display_restaurant_card(row, user_bookmarks, user_reviews, i)
+
+def change_results_page(step):
+    st.session_state.results_page += step
+
+def results_page(rows):
+    # Current page of the results (back to the first whenever the results change),
+    # with previous/next controls when there is more than one page
+    results = tuple(row['placeID'] for row in rows)
+    if st.session_state.get("results") != results:
+        st.session_state.results = results
+        st.session_state.results_page = 0
+    
+    n_pages = max(1, -(-len(rows) // CARDS_PER_PAGE))
+    page = min(max(st.session_state.results_page, 0), n_pages - 1)
+    st.session_state.results_page = page
+    
+    if n_pages > 1:
+        prev_col, label_col, next_col = st.columns([1, 2, 1])
+        prev_col.button("◀ Previous", key="results_previous", disabled=page == 0,
+                        on_click=change_results_page, args=(-1,))
+        label_col.markdown(f"Page {page + 1} of {n_pages}")
+        next_col.button("Next ▶", key="results_next", disabled=page == n_pages - 1,
+                        on_click=change_results_page, args=(1,))
+    return page
+
+@st.cache_data(max_entries=1000)
+def card_markup(place_id, name, cuisine, avg_rating, group_score, distance_km, latitude, longitude):
+    # Static parts of a result card, built once per restaurant (and distance).
+    # Images are picked per restaurant, so they stay put across reruns.
+    first_cuisine = str(cuisine).split(';')[0].strip().lower()
+    images = get_image_cache()
+    thumbnails = images.thumbnails(first_cuisine)
+    return {
+        "title": f"### {name} ({cuisine})",
+        "has_folder": first_cuisine in images,
+        "images": random.Random(place_id).sample(thumbnails, min(2, len(thumbnails))),
+        "cuisine": f"**Cuisine:** {cuisine}",
+        "stars": display_star_rating(avg_rating),
+        "group": f"**Group Friendly:** {group_score:.2f}",
+        "distance": f"**Distance:** {distance_km} km",
+        "map": f"[📍 View on Map](https://www.google.com/maps/search/?api=1&query={latitude},{longitude})",
+    }
 
-def display_restaurant_card(row, user_bookmarks, index):
+def display_restaurant_card(row, user_bookmarks, user_reviews, index):
+    markup = card_markup(row['placeID'], row['name'], row['Rcuisine_x'], row['avg_rating'],
+                         row['group_friendly_score'], row['distance_km'],
+                         row['rest_latitude'], row['rest_longitude'])
+    # Widget keys stay the same across reruns (the rank keeps repeated placeIDs apart)
+    card_key = f"{row['placeID']}_{index}"
+    
     with st.container():
-        st.markdown(f"### {row['name']} ({row['Rcuisine_x']})")
-        
-        # Find cuisine images
-        first_cuisine = str(row['Rcuisine_x']).split(';')[0].strip().lower()
-        cuisine_folder = os.path.join("restaurant_images", first_cuisine)
+        st.markdown(markup["title"])
         
-        if os.path.exists(cuisine_folder):
-            image_files = [f for f in os.listdir(cuisine_folder) if f.endswith(('.jpg', '.png', '.jpeg'))]
-            if image_files:
-                selected_images = random.sample(image_files, min(2, len(image_files)))
-                img_cols = st.columns(len(selected_images))
-                
-                for j, image in enumerate(selected_images):
-                    image_path = os.path.join(cuisine_folder, image)
-                    img_cols[j].image(image_path, use_container_width=True)
-            else:
-                st.image("https://via.placeholder.com/300x200.png?text=No+Image", caption="No images available", use_container_width=True)
+        # Cuisine images
+        if markup["images"]:
+            img_cols = st.columns(len(markup["images"]))
+            
+            for j, image_path in enumerate(markup["images"]):
+                img_cols[j].image(image_path, use_container_width=True)
+        elif markup["has_folder"]:
+            st.image("https://via.placeholder.com/300x200.png?text=No+Image", caption="No images available", use_container_width=True)
         else:
             st.image("https://via.placeholder.com/300x200.png?text=No+Image", caption="Cuisine folder not found", use_container_width=True)
         
@@ -437,32 +505,29 @@ def display_restaurant_card(row, user_bookmarks, index):
         details_col1, details_col2 = st.columns(2)
         
         with details_col1:
-            st.markdown(f"**Cuisine:** {row['Rcuisine_x']}")
-            st.markdown(display_star_rating(row['avg_rating']), unsafe_allow_html=True)
+            st.markdown(markup["cuisine"])
+            st.markdown(markup["stars"], unsafe_allow_html=True)
         
         with details_col2:
-            st.markdown(f"**Group Friendly:** {row['group_friendly_score']:.2f}")
-            st.markdown(f"**Distance:** {row['distance_km']} km")
+            st.markdown(markup["group"])
+            st.markdown(markup["distance"])
             
-        st.markdown(f"[📍 View on Map](https://www.google.com/maps/search/?api=1&query={row['rest_latitude']},{row['rest_longitude']})")
+        st.markdown(markup["map"])
 
-        # Review section
-        st.markdown("### 📝 Your Review")
-        user_reviews = get_user_reviews(st.session_state.username)
+        # Review section, with the form only rendered once opened
         existing_review = user_reviews.get(row['name'], {})
         
-        # Create a unique key for each form using restaurant name and index
-        unique_form_key = f"review_form_{row['name']}_{index}_{random.randint(0, 10000)}"
-        with st.form(unique_form_key):
-            review_text = st.text_area("Write your review", value=existing_review.get("text", ""))
-            review_rating = st.slider("Your Rating", 1.0, 5.0, float(existing_review.get("rating", 3.0)), 0.5)
-            
-            if st.form_submit_button("Save Review"):
-                if review_text.strip():
-                    save_user_review(st.session_state.username, row['name'], review_text, review_rating)
-                    st.success("Review saved successfully!")
-                else:
-                    st.warning("Please write a review before saving.")
+        if st.checkbox("📝 Edit your review" if existing_review else "📝 Write a review", key=f"review_open_{card_key}"):
+            with st.form(f"review_form_{card_key}"):
+                review_text = st.text_area("Write your review", value=existing_review.get("text", ""))
+                review_rating = st.slider("Your Rating", 1.0, 5.0, float(existing_review.get("rating", 3.0)), 0.5)
+                
+                if st.form_submit_button("Save Review"):
+                    if review_text.strip():
+                        save_user_review(st.session_state.username, row['name'], review_text, review_rating)
+                        st.success("Review saved successfully!")
+                    else:
+                        st.warning("Please write a review before saving.")
         
         # Display existing review
         if existing_review:
@@ -471,15 +536,10 @@ def display_restaurant_card(row, user_bookmarks, index):
             st.markdown(f"*{existing_review['text']}*")
             st.markdown(f"*Posted on: {existing_review['timestamp']}*")
 
-        # Bookmark button with unique key
-        button_key = f"bookmark_{row['name']}_{index}_{random.randint(0, 10000)}"
-        
         if row['name'] not in user_bookmarks:
-            if st.button(f"🔖 Bookmark", key=button_key):
+            if st.button(f"🔖 Bookmark", key=f"bookmark_{card_key}"):
                 user_bookmarks.append(row['name'])
-                bookmarks = load_data(DATA_FILES["BOOKMARK_FILE"])
-                bookmarks[st.session_state.username] = user_bookmarks
-                save_data(bookmarks, DATA_FILES["BOOKMARK_FILE"])
+                add_user_bookmark(st.session_state.username, row['name'])
                 st.success(f"Bookmarked {row['name']}!")
         else:
             st.info("✅ Already Bookmarked")
@@ -501,8 +561,7 @@ def sidebar_filters():
     if st.session_state.username != "Guest":
         st.sidebar.markdown("---")
         
-        bookmarks = load_data(DATA_FILES["BOOKMARK_FILE"])
-        user_bookmarks = bookmarks.get(st.session_state.username, [])
+        user_bookmarks = get_user_bookmarks(st.session_state.username)
         
         if user_bookmarks:
             st.sidebar.markdown(f"### 🔖 {len(user_bookmarks)} Bookmarked Restaurants")
@@ -520,9 +579,9 @@ def sidebar_filters():
     # Define filter options
     days_options = {
         "Any": None,
-        "Weekday (Mon-Fri)": "days_Mon;Tue;Wed;Thu;Fri;",
-        "Saturday": "days_Sat;",
-        "Sunday": "days_Sun;"
+        "Weekday (Mon-Fri)": ["mon", "tue", "wed", "thu", "fri"],
+        "Saturday": ["sat"],
+        "Sunday": ["sun"]
     }
     
     time_slots = {
@@ -534,7 +593,10 @@ def sidebar_filters():
     
     # Collect filters
     filters = {
-        "cuisine": st.sidebar.selectbox("Preferred Cuisine", ["Any"] + sorted(restaurant_df['Rcuisine_x'].dropna().unique())),
+        "cuisine": st.sidebar.selectbox(
+            "Preferred Cuisine", ["Any"] + get_restaurant_filter(datasets.version("restaurants")).index.cuisines,
+            format_func=lambda token: token.replace('_', ' ').title()
+        ),
         "distance": st.sidebar.slider("Maximum Distance (km)", 1, 50, 10),
         "group_score": st.sidebar.slider("Minimum Group Friendliness", 0.0, 1.0, 0.5),
         "min_rating": st.sidebar.slider("Minimum Average Rating", 1.0, 5.0, 3.0, 0.5),
@@ -552,8 +614,8 @@ def sidebar_filters():
     return filters
 
 def main():
-    # Initialize files and session state
-    init_files()
+    # Open the storage backend and initialize session state
+    get_backend()
     init_session_state()
     
     # Set page config for a wider layout
@@ -0,0 +1,284 @@
+"""
+Offline benchmark and evaluation suite for the recommender.
+
+For each synthetic size it builds a model from a generated rating table with
+the same columns as processed_data.csv and reports the build time, the peak
+memory of the build and the size of the feature and similarity structures,
+plus p50/p95/p99 latency of get_soft_filtered_recommendations. Ranking quality
+(precision@k and NDCG@k) is measured on a held-out split of the real ratings.
+Results are compared against a stored baseline and regressions are flagged.
+
+    python benchmark.py --sizes 1000 10000 --queries 200
+    python benchmark.py --save-baseline
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+import data_loader
+import recommender
+
+# Default synthetic sizes. The neighbour graph grows quadratically with the
+# number of places, so larger runs (e.g. --sizes 1000000, about 125k places)
+# take minutes and are best run on their own
+SIZES = [1_000, 10_000, 100_000]
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Average ratings per place and per user in the generated tables
+RATINGS_PER_PLACE = 8
+RATINGS_PER_USER = 10
+
+# Allowed slowdown/growth over the baseline before a metric is flagged, and
+# allowed absolute drop in a quality metric
+REGRESSION_TOLERANCE = 0.2
+QUALITY_TOLERANCE = 0.01
+
+CUISINES = [
+    'Mexican', 'Bar', 'Cafeteria', 'Fast_Food', 'American', 'Pizzeria', 'Seafood', 'Chinese',
+    'Japanese', 'Italian', 'International', 'Bakery', 'Burgers', 'Family', 'Vegetarian'
+]
+CATEGORIES = {
+    'alcohol': ['No_Alcohol_Served', 'Wine-Beer', 'Full_Bar'],
+    'smoking_area': ['none', 'section', 'only at bar', 'permitted', 'not permitted'],
+    'dress_code': ['informal', 'casual', 'formal'],
+    'accessibility': ['no_accessibility', 'completely', 'partially'],
+    'price': ['low', 'medium', 'high'],
+    'Rambience': ['familiar', 'quiet'],
+    'franchise': ['f', 't'],
+    'area': ['open', 'closed'],
+    'other_services': ['none', 'Internet', 'variety'],
+}
+HOURS = ['08:00-21:00;', '12:00-23:30;', '18:00-02:00;', '09:00-13:00;16:00-20:00;', '00:00-23:59;']
+DAY_COLUMNS = ['days_Mon;Tue;Wed;Thu;Fri;', 'days_Sat;', 'days_Sun;']
+
+# Requests timed for every size
+LATENCY_CASES = [
+    {},
+    {'cuisine': 'mexican', 'max_distance': 5, 'days': ['mon', 'fri']},
+    {'cuisine': 'bar', 'max_distance': 20, 'min_group_score': 0.8},
+]
+
+
+def generate_catalog(n_rows, seed=0):
+    """
+    Synthetic rating-level table with `n_rows` ratings in the processed_data.csv
+    layout, plus a matching userprofile.csv table of user home locations.
+    Places are spread around a handful of city centres so the location
+    clusters are realistic.
+    """
+    rng = np.random.default_rng(seed)
+    fake = Faker('es_MX')
+    fake.seed_instance(seed)
+    n_places = max(n_rows // RATINGS_PER_PLACE, 1)
+    n_users = max(n_rows // RATINGS_PER_USER, 1)
+
+    centres = rng.uniform([19.0, -104.0], [24.0, -98.0], size=(max(n_places // 500, 1), 2))
+    place_centres = centres[rng.integers(len(centres), size=n_places)]
+    cuisine_x = rng.choice(CUISINES, size=(n_places, 2))
+    places = pd.DataFrame({
+        'placeID': np.arange(100000, 100000 + n_places),
+        'name': [fake.company() for _ in range(n_places)],
+        'rest_latitude': place_centres[:, 0] + rng.normal(0, 0.03, n_places),
+        'rest_longitude': place_centres[:, 1] + rng.normal(0, 0.03, n_places),
+        **{column: rng.choice(values, n_places) for column, values in CATEGORIES.items()},
+        'Rcuisine_x': np.where(rng.random(n_places) < 0.5, cuisine_x[:, 0], np.char.add(
+            np.char.add(cuisine_x[:, 0], ';'), cuisine_x[:, 1])),
+        'Rcuisine_y': np.where(rng.random(n_places) < 0.5, rng.choice(CUISINES, n_places), None),
+        'distance_km': rng.uniform(0, 30, n_places).round(2),
+        'popularity_score_scaled': rng.random(n_places),
+        'food_rating_scaled': rng.random(n_places),
+        'service_rating_scaled': rng.random(n_places),
+        'trending_score': rng.random(n_places),
+        'group_friendly_score': rng.random(n_places),
+        'avg_rating': rng.uniform(0, 2, n_places).round(2),
+        'hours': rng.choice(HOURS, n_places),
+        **{column: rng.integers(0, 2, n_places) for column in DAY_COLUMNS},
+    })
+
+    user_ids = np.array([f"U{100000 + u}" for u in range(n_users)])
+    ratings = pd.DataFrame({
+        'userID': user_ids[rng.integers(n_users, size=n_rows)],
+        'rating': rng.integers(0, 3, n_rows),
+        'food_rating': rng.integers(0, 3, n_rows),
+        'service_rating': rng.integers(0, 3, n_rows),
+    })
+    data = pd.concat([ratings, places.iloc[rng.integers(n_places, size=n_rows)].reset_index(drop=True)], axis=1)
+
+    user_centres = centres[rng.integers(len(centres), size=n_users)]
+    user_profiles = pd.DataFrame({
+        'userID': user_ids,
+        'latitude': user_centres[:, 0] + rng.normal(0, 0.05, n_users),
+        'longitude': user_centres[:, 1] + rng.normal(0, 0.05, n_users),
+    })
+    return data, user_profiles
+
+
+def structure_megabytes(model):
+    """Size in MB of the feature structures and of the similarity (neighbour and IVF) structures."""
+    def size(names):
+        return sum(np.asarray(model[name]).nbytes for name in names) / 2 ** 20
+    return {
+        'feature_mb': size(['content_features_matrix', 'normalized_features']),
+        'similarity_mb': size(['neighbor_indptr', 'neighbor_indices', 'neighbor_sims',
+                               'ivf_centroids', 'ivf_indptr', 'ivf_items']),
+    }
+
+
+def ranking_digest(model, user_ids, top_n=10):
+    """Hash of the ranked placeIDs for `user_ids`, to spot optimizations that change rankings."""
+    digest = hashlib.sha256()
+    for user_id in user_ids:
+        for case in LATENCY_CASES:
+            ranked = recommender.recommend(model, user_id, top_n=top_n, **case)['placeID'].to_numpy()
+            digest.update(np.ascontiguousarray(ranked, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def run_size(n_rows, n_queries=200, top_n=10, seed=0, **search):
+    """Build a model for a synthetic catalogue of `n_rows` ratings and time requests against it."""
+    data, user_profiles = generate_catalog(n_rows, seed)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    model = recommender.build_model(data, user_profiles)
+    build_s = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    model = recommender.prepare_model(model)
+    recommender.replace_model(model)
+
+    rng = np.random.default_rng(seed)
+    users = rng.choice(model['user_ids'], size=n_queries)
+    latencies = []
+    for i, user_id in enumerate(users):
+        case = LATENCY_CASES[i % len(LATENCY_CASES)]
+        start = time.perf_counter()
+        recommender.get_soft_filtered_recommendations(user_id, top_n=top_n, **case, **search)
+        latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+
+    return {
+        'rows': n_rows,
+        'places': len(model['items']),
+        'users': len(model['user_ids']),
+        'build_s': build_s,
+        'build_peak_mb': peak / 2 ** 20,
+        **structure_megabytes(model),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'ranking_digest': ranking_digest(model, model['user_ids'][:20], top_n),
+    }
+
+
+def evaluate_quality(data_path=recommender.DATA_PATH, k=10, test_fraction=0.2, seed=0,
+                     user_profile_path=recommender.USER_PROFILE_PATH, **search):
+    """
+    Precision@k and NDCG@k on a held-out split of the real ratings. A share of
+    each user's ratings is hidden from the model (the places stay in the
+    catalogue); places already rated in training are not recommended again,
+    and a held-out place the user rated above 0 counts as relevant.
+    """
+    data = data_loader.load_processed(data_path, recommender.model_columns)
+    user_profiles = pd.read_csv(user_profile_path) if os.path.exists(user_profile_path) else None
+    rng = np.random.default_rng(seed)
+    held_out = (rng.random(len(data)) < test_fraction) & data['userID'].notna()
+    test = data[held_out]
+
+    train = data.copy()
+    train.loc[held_out, 'userID'] = np.nan  # keeps the place in the catalogue without the rating
+    model = recommender.prepare_model(recommender.build_model(train, user_profiles))
+    place_ids = model['items']['placeID'].to_numpy()
+    discounts = 1 / np.log2(np.arange(2, k + 2))
+
+    precisions, ndcgs = [], []
+    for user_id, ratings in test.groupby('userID'):
+        relevant = set(ratings.loc[ratings['rating'] > 0, 'placeID'])
+        history = recommender.get_user_history(model, user_id)
+        if not relevant or history is None:
+            continue
+        seen = set(place_ids[history[0]])
+        ranked = recommender.recommend(model, user_id, top_n=k + len(seen), **search)['placeID']
+        ranked = [place_id for place_id in ranked if place_id not in seen][:k]
+        gains = np.array([place_id in relevant for place_id in ranked] + [False] * (k - len(ranked)))
+        precisions.append(gains.mean())
+        ndcgs.append((gains * discounts).sum() / discounts[:min(len(relevant), k)].sum())
+
+    return {'k': k, 'users': len(precisions),
+            f'precision@{k}': float(np.mean(precisions)) if precisions else float('nan'),
+            f'ndcg@{k}': float(np.mean(ndcgs)) if ndcgs else float('nan')}
+
+
+def find_regressions(results, baseline, tolerance=REGRESSION_TOLERANCE, quality_tolerance=QUALITY_TOLERANCE):
+    """Human-readable descriptions of every metric that got worse than the baseline allows."""
+    regressions = []
+    baseline_sizes = {str(run['rows']): run for run in baseline.get('sizes', [])}
+    for run in results['sizes']:
+        previous = baseline_sizes.get(str(run['rows']))
+        if previous is None:
+            continue
+        for metric in ['build_s', 'build_peak_mb', 'feature_mb', 'similarity_mb', 'p50_ms', 'p95_ms', 'p99_ms']:
+            if run[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{run['rows']} rows: {metric} {previous[metric]:.3f} -> {run[metric]:.3f}")
+        if run['ranking_digest'] != previous['ranking_digest']:
+            regressions.append(f"{run['rows']} rows: rankings changed")
+
+    quality, previous = results.get('quality'), baseline.get('quality')
+    if quality and previous:
+        for metric, value in quality.items():
+            if metric.startswith(('precision@', 'ndcg@')) and value < previous.get(metric, value) - quality_tolerance:
+                regressions.append(f"quality: {metric} {previous[metric]:.4f} -> {value:.4f}")
+    return regressions
+
+
+def run_benchmark(sizes=SIZES, n_queries=200, top_n=10, data_path=recommender.DATA_PATH, **search):
+    results = {'sizes': []}
+    for n_rows in sizes:
+        run = run_size(n_rows, n_queries, top_n, **search)
+        results['sizes'].append(run)
+        print(f"{run['rows']:>9} rows  {run['places']:>7} places  build {run['build_s']:8.2f}s  "
+              f"peak {run['build_peak_mb']:8.1f}MB  features {run['feature_mb']:7.1f}MB  "
+              f"similarity {run['similarity_mb']:7.1f}MB  p50 {run['p50_ms']:6.2f}ms  "
+              f"p95 {run['p95_ms']:6.2f}ms  p99 {run['p99_ms']:6.2f}ms")
+
+    if os.path.exists(data_path):
+        results['quality'] = evaluate_quality(data_path, top_n, **search)
+        print(f"quality on {results['quality']['users']} held-out users: " + "  ".join(
+            f"{metric} {value:.4f}" for metric, value in results['quality'].items() if '@' in metric))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark and evaluate the recommender.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="synthetic rating-table sizes")
+    parser.add_argument("--queries", type=int, default=200, help="timed requests per size")
+    parser.add_argument("--top-n", type=int, default=10, help="recommendations per request (the k of the metrics)")
+    parser.add_argument("--search", default="exact", help="search mode passed to the recommender")
+    parser.add_argument("--data", default=recommender.DATA_PATH, help="real ratings for the quality metrics")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.queries, args.top_n, args.data, search=args.search)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            regressions = find_regressions(results, json.load(f))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
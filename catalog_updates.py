@@ -0,0 +1,380 @@
+"""
+Incremental catalogue updates for the recommender.
+
+Restaurants can be added, updated or removed and ratings added without refitting
+the encoders or recomputing every similarity: new rows are encoded with the
+fitted column maps (unseen cuisines and categories get new columns), numerics use
+the fitted scaler while their observed range is tracked, and only the neighbour
+lists the change touches are patched. A full rebuild happens only once a numeric
+range drifts past the configured threshold.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import normalize
+
+import recommender
+import schedule
+import cuisines
+from spatial_index import SpatialIndex
+
+# Largest growth of a numeric feature's observed range beyond the range the scaler
+# was fitted on, as a fraction of that range, before a full rebuild is triggered
+REBUILD_DRIFT_THRESHOLD = 0.25
+
+_update_lock = threading.Lock()
+
+
+def scaling_drift(model):
+    """How far the observed numeric ranges extend beyond the fitted ones, relative to them."""
+    scaler = model['scaler2']
+    fitted_range = np.where(scaler.data_range_ > 0, scaler.data_range_, 1.0)
+    growth = (
+        np.maximum(scaler.data_min_ - model['numeric_observed_min'], 0)
+        + np.maximum(model['numeric_observed_max'] - scaler.data_max_, 0)
+    )
+    return float(np.max(growth / fitted_range)) if len(growth) else 0.0
+
+
+def encode_restaurants(model, records):
+    """
+    Raw feature rows for `records`, plus the cuisine and category column maps and
+    matrix width extended with any tokens or values not seen before.
+    """
+    cuisine_columns = dict(model['cuisine_columns'])
+    category_columns = dict(model['category_columns'])
+    width = model['content_features_matrix'].shape[1]
+    if not len(records):
+        return np.zeros((0, width)), cuisine_columns, category_columns
+
+    def column(columns, key):
+        nonlocal width
+        if key not in columns:
+            columns[key] = width
+            width += 1
+        return columns[key]
+
+    cells = []
+    for row, record in enumerate(records.to_dict('records')):
+        for token in record['combined_cuisine']:
+            cells.append((row, column(cuisine_columns, token)))
+        for feature in recommender.categorical_features:
+            value = record.get(feature)
+            cells.append((row, column(category_columns, (feature, None if pd.isna(value) else value))))
+
+    encoded = np.zeros((len(records), width))
+    for row, col in cells:
+        encoded[row, col] = 1.0
+    numeric_positions = [model['numeric_columns'][name] for name in recommender.numerical_features]
+    encoded[:, numeric_positions] = model['scaler2'].transform(records[recommender.numerical_features])
+    return encoded, cuisine_columns, category_columns
+
+
+def _pad_columns(matrix, width):
+    return np.pad(matrix, ((0, 0), (0, width - matrix.shape[1])))
+
+
+def _normalize(rows):
+    return normalize(rows) if len(rows) else rows
+
+
+def _patch_neighbors(model, normalized, active, changed, stale):
+    """
+    Neighbour lists after a change. `changed` are positions whose vectors are new
+    or updated, `stale` are updated or removed positions that other lists may
+    still reference; only those lists and the ones a changed item now enters are
+    touched.
+    """
+    n = len(normalized)
+    n_old = len(model['neighbor_indptr']) - 1
+    k = int(model['neighbor_indptr'][1]) if n_old else 0
+    indices = np.zeros((n, k), dtype=np.int32)
+    sims = np.full((n, k), -np.inf, dtype=np.float32)
+    indices[:n_old] = model['neighbor_indices'].reshape(n_old, k)
+    sims[:n_old] = model['neighbor_sims'].reshape(n_old, k)
+
+    def recompute(rows):
+        if not len(rows) or not k:
+            return
+        block = normalized[rows] @ normalized.T
+        block[:, ~active] = -np.inf
+        block[np.arange(len(rows)), rows] = -np.inf
+        top = recommender.top_k_indices(block, k)
+        indices[rows] = top
+        sims[rows] = np.take_along_axis(block, top, axis=1)
+
+    # Lists that reference an updated or removed item, and the changed items' own lists
+    references_stale = np.flatnonzero(np.isin(indices[:n_old], stale).any(axis=1)) if k else []
+    recompute(np.union1d(references_stale, changed).astype(np.intp))
+
+    # Every other list only needs a changed item inserted where it now ranks
+    untouched = np.ones(n, dtype=bool)
+    untouched[references_stale] = False
+    untouched[changed] = False
+    untouched &= active
+    for c in changed if k else []:
+        if not active[c]:
+            continue
+        sim = normalized @ normalized[c]
+        rows = np.flatnonzero(untouched & (sim > sims[:, -1]))
+        candidate_indices = np.column_stack([indices[rows], np.full(len(rows), c)])
+        candidate_sims = np.column_stack([sims[rows], sim[rows]])
+        order = np.argsort(-candidate_sims, axis=1, kind='stable')[:, :k]
+        indices[rows] = np.take_along_axis(candidate_indices, order, axis=1)
+        sims[rows] = np.take_along_axis(candidate_sims, order, axis=1)
+
+    return {
+        'neighbor_indptr': np.arange(0, n * k + 1, k, dtype=np.int64) if k else np.zeros(n + 1, dtype=np.int64),
+        'neighbor_indices': indices.ravel(),
+        'neighbor_sims': sims.ravel(),
+    }
+
+
+def _reassign_ivf(model, normalized, changed):
+    """Inverted lists with the changed items moved to their nearest centroid."""
+    centroids = _pad_columns(model['ivf_centroids'], normalized.shape[1])
+    indptr = model['ivf_indptr']
+    assignments = np.zeros(len(normalized), dtype=np.int32)
+    assignments[model['ivf_items']] = np.repeat(np.arange(len(centroids)), np.diff(indptr))
+    if len(changed) and len(centroids):
+        assignments[changed] = recommender.assign_to_centroids(normalized[changed], centroids)
+    return {
+        'ivf_centroids': centroids,
+        'ivf_indptr': np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))]),
+        'ivf_items': np.argsort(assignments, kind='stable').astype(np.int32),
+    }
+
+
+def _add_interactions(model, place_index, ratings):
+    """Interaction arrays and per-user arrays with `ratings` (user, place, rating) appended."""
+    user_ids = model['user_ids']
+    codes = np.repeat(np.arange(len(user_ids)), np.diff(model['user_indptr']))
+    items = np.asarray(model['interaction_items'])
+    values = np.asarray(model['interaction_ratings'])
+    updated = {}
+
+    if ratings:
+        new_users = np.array([str(user_id) for user_id, _, _ in ratings])
+        all_user_ids = np.union1d(user_ids, new_users)
+        remap = np.searchsorted(all_user_ids, user_ids)
+        codes = np.concatenate([remap[codes], np.searchsorted(all_user_ids, new_users)])
+        items = np.concatenate([items, place_index.get_indexer([place_id for _, place_id, _ in ratings])])
+        values = np.concatenate([values, np.array([rating for _, _, rating in ratings], dtype=np.float32)])
+
+        for name, fill in (('user_profile_sums', 0.0), ('user_latitudes', np.nan), ('user_longitudes', np.nan)):
+            grown = np.full((len(all_user_ids),) + model[name].shape[1:], fill)
+            grown[remap] = model[name]
+            updated[name] = grown
+        user_ids = all_user_ids
+
+    order = np.argsort(codes, kind='stable')
+    updated.update({
+        'user_ids': user_ids,
+        'user_indptr': np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(user_ids)))]),
+        'interaction_items': items[order].astype(np.int32),
+        'interaction_ratings': values[order].astype(np.float32),
+    })
+    return updated
+
+
+def apply_catalog_delta(model, restaurants=None, removed=(), ratings=()):
+    """
+    A new model with `restaurants` (a DataFrame of catalogue rows; existing
+    placeIDs are updated in place, others appended) upserted, the `removed`
+    placeIDs deactivated and `ratings` ((userID, placeID, rating) tuples) added.
+    `model` itself is left untouched.
+    """
+    restaurants = model['items'].iloc[:0] if restaurants is None else restaurants.reset_index(drop=True)
+    for column in ('Rcuisine_x', 'Rcuisine_y'):
+        if column not in restaurants.columns:
+            restaurants[column] = np.nan
+    items = model['items'].copy()
+    place_index = pd.Index(items['placeID'])
+
+    known = set(place_index) | set(restaurants['placeID'])
+    unknown = {p for p in removed if p not in place_index} | {p for _, p, _ in ratings if p not in known}
+    if unknown:
+        raise KeyError(f"Place IDs not found: {sorted(unknown)}")
+
+    # Encode the upserted rows against the fitted vocabularies
+    restaurants = restaurants.assign(combined_cuisine=[
+        cuisines.split_cuisines(x, y) for x, y in zip(restaurants['Rcuisine_x'], restaurants['Rcuisine_y'])
+    ])
+    encoded, cuisine_columns, category_columns = encode_restaurants(model, restaurants)
+    width = encoded.shape[1]
+
+    existing = place_index.get_indexer(restaurants['placeID'])
+    updated_positions = existing[existing >= 0]
+    appended = restaurants[existing < 0]
+    new_positions = np.arange(len(items), len(items) + len(appended))
+
+    # Rows: updates overwrite their position, new restaurants are appended after the last shard
+    appended = appended.assign(location_cluster=[
+        recommender.assign_location_cluster(model, lat, lon)
+        for lat, lon in zip(appended['rest_latitude'], appended['rest_longitude'])
+    ])
+    for position, record in zip(updated_positions, restaurants[existing >= 0].to_dict('records')):
+        for column, value in record.items():
+            if column in items.columns and column != 'location_cluster':
+                items.at[position, column] = value
+    items = pd.concat([items, appended], ignore_index=True)
+
+    features = np.vstack([_pad_columns(model['content_features_matrix'], width), encoded[existing < 0]])
+    features[updated_positions] = encoded[existing >= 0]
+    normalized = np.vstack([_pad_columns(model['normalized_features'], width), _normalize(encoded[existing < 0])])
+    old_normalized = np.array(normalized[updated_positions])
+    normalized[updated_positions] = _normalize(encoded[existing >= 0])
+
+    open_hours = np.vstack([model['open_hours'], np.zeros((len(appended), len(schedule.DAYS)), dtype=np.uint32)])
+    open_hours[updated_positions] = schedule.compile_rows(items.iloc[updated_positions])
+    open_hours[new_positions] = schedule.compile_rows(items.iloc[new_positions])
+
+    active = np.concatenate([model['active'], np.ones(len(appended), dtype=bool)])
+    active[updated_positions] = True
+    removed_positions = place_index.get_indexer(list(removed))
+    active[removed_positions] = False
+
+    changed = np.concatenate([updated_positions, new_positions]).astype(np.intp)
+    stale = np.concatenate([updated_positions, removed_positions]).astype(np.intp)
+
+    # Grow the bounding boxes of shards whose members moved
+    bounds = np.array(model['shard_bounds'])
+    sharded = updated_positions[updated_positions < model['shard_indptr'][-1]]
+    shard_of = np.searchsorted(model['shard_indptr'], sharded, side='right') - 1
+    for shard, lat, lon in zip(shard_of, items['rest_latitude'].to_numpy()[sharded],
+                               items['rest_longitude'].to_numpy()[sharded]):
+        if not (pd.isna(lat) or pd.isna(lon)):
+            bounds[shard] = (np.fmin(bounds[shard, 0], lat), np.fmax(bounds[shard, 1], lat),
+                             np.fmin(bounds[shard, 2], lon), np.fmax(bounds[shard, 3], lon))
+
+    cuisine_vocabulary, cuisine_matrix = cuisines.tokenize(
+        items['Rcuisine_x'], items['Rcuisine_y'], model['cuisine_vocabulary']
+    )
+    cuisine_indptr, cuisine_postings = cuisines.build_postings(cuisine_matrix)
+
+    numerics = restaurants[recommender.numerical_features].to_numpy(dtype=np.float64) if len(restaurants) else None
+    new_cuisines = set(t for tokens in restaurants['combined_cuisine'] for t in tokens)
+
+    updated = dict(model)
+    for name in recommender.RUNTIME_ARTIFACTS:
+        updated.pop(name, None)
+    updated.update({
+        'items': items,
+        'available_cuisines': sorted(set(model['available_cuisines']) | new_cuisines),
+        'content_features_matrix': features,
+        'normalized_features': normalized,
+        'location_cluster': items['location_cluster'].to_numpy(),
+        'active': active,
+        'open_hours': open_hours,
+        'cuisine_columns': cuisine_columns,
+        'cuisine_vocabulary': cuisine_vocabulary,
+        'cuisine_indptr': cuisine_indptr,
+        'cuisine_postings': cuisine_postings,
+        'category_columns': category_columns,
+        'numeric_observed_min': model['numeric_observed_min'] if numerics is None
+        else np.fmin(model['numeric_observed_min'], np.nanmin(numerics, axis=0)),
+        'numeric_observed_max': model['numeric_observed_max'] if numerics is None
+        else np.fmax(model['numeric_observed_max'], np.nanmax(numerics, axis=0)),
+        'spatial_index': SpatialIndex(items['rest_latitude'], items['rest_longitude']),
+        'shard_bounds': bounds,
+        'user_profile_sums': _pad_columns(model['user_profile_sums'], width),
+        'fingerprint': model.get('fingerprint'),
+        **_patch_neighbors(model, normalized, active, changed, stale),
+        **_reassign_ivf(model, normalized, changed),
+    })
+
+    # Users who rated an updated restaurant get their profile moved to its new vector
+    if len(updated_positions):
+        sums = np.array(updated['user_profile_sums'])
+        rated = np.isin(model['interaction_items'], updated_positions)
+        users = np.repeat(np.arange(len(model['user_ids'])), np.diff(model['user_indptr']))[rated]
+        positions = np.asarray(model['interaction_items'])[rated]
+        weights = np.asarray(model['interaction_ratings'])[rated] + recommender.PROFILE_RATING_OFFSET
+        moved = dict(zip(updated_positions, normalized[updated_positions] - old_normalized))
+        np.add.at(sums, users, weights[:, None] * np.array([moved[p] for p in positions]).reshape(-1, width))
+        updated['user_profile_sums'] = sums
+
+    ratings = list(ratings)
+    updated.update(_add_interactions(updated, pd.Index(items['placeID']), ratings))
+
+    # New ratings go into the profile sums, so a saved bundle has them too
+    if ratings:
+        sums = np.array(updated['user_profile_sums'])
+        users = np.searchsorted(updated['user_ids'], [str(user_id) for user_id, _, _ in ratings])
+        positions = pd.Index(items['placeID']).get_indexer([place_id for _, place_id, _ in ratings])
+        weights = np.array([rating for _, _, rating in ratings], dtype=np.float64) + recommender.PROFILE_RATING_OFFSET
+        np.add.at(sums, users, weights[:, None] * normalized[positions])
+        updated['user_profile_sums'] = sums
+    updated = recommender.prepare_model(updated, model['user_profiles'])
+
+    # A user with a pending overlay is read from it, so it needs the new ratings as well
+    for user_id, place_id, rating in ratings:
+        if updated['user_profiles'].has_overlay(user_id):
+            updated['user_profiles'].add_rating(user_id, place_id, rating)
+    return updated
+
+
+def rebuild_model(model):
+    """
+    Full rebuild of an incrementally updated model from its own catalogue and
+    ratings. Profile changes made only through recommender.update_user_profile
+    are not part of the ratings and do not survive it.
+    """
+    items = model['items'].drop(columns=['location_cluster', 'combined_cuisine'])
+    active = model['active']
+    users = np.repeat(model['user_ids'], np.diff(model['user_indptr']))
+    rated = active[model['interaction_items']]
+
+    ratings = items.iloc[np.asarray(model['interaction_items'])[rated]].assign(
+        userID=users[rated], rating=np.asarray(model['interaction_ratings'])[rated]
+    )
+    unrated = np.setdiff1d(np.flatnonzero(active), model['interaction_items'])
+    data = pd.concat([ratings, items.iloc[unrated]], ignore_index=True)
+    user_profiles = pd.DataFrame({
+        'userID': model['user_ids'], 'latitude': model['user_latitudes'], 'longitude': model['user_longitudes']
+    })
+
+    rebuilt = recommender.build_model(data, user_profiles)
+    rebuilt['fingerprint'] = model.get('fingerprint')
+
+    # The catalogue keeps one row per place, so carry over schedules compiled from all of its rows
+    previous = pd.Index(items['placeID']).get_indexer(rebuilt['items']['placeID'])
+    rebuilt['open_hours'] = np.asarray(model['open_hours'])[previous]
+    return recommender.prepare_model(rebuilt)
+
+
+def update_catalog(restaurants=None, removed=(), ratings=(), drift_threshold=REBUILD_DRIFT_THRESHOLD,
+                   bundle_dir=None):
+    """
+    Apply a catalogue delta to the loaded recommender model and swap it in. Falls
+    back to a full rebuild when the numeric scaling drift exceeds
+    `drift_threshold`. With `bundle_dir`, the updated model is also saved there.
+    Returns the new model.
+    """
+    with _update_lock:
+        model = apply_catalog_delta(recommender.load_model(), restaurants, removed, ratings)
+        if scaling_drift(model) > drift_threshold:
+            model = rebuild_model(model)
+        recommender.replace_model(model)
+        if bundle_dir:
+            with recommender.build_lock(bundle_dir):
+                recommender.save_bundle(model, bundle_dir, model['fingerprint'])
+    return model
+
+
+def add_restaurant(record, **kwargs):
+    """Add (or update, if its placeID exists) one restaurant given as a dict of catalogue columns."""
+    return update_catalog(restaurants=pd.DataFrame([record]), **kwargs)
+
+
+def update_restaurant(record, **kwargs):
+    return add_restaurant(record, **kwargs)
+
+
+def remove_restaurant(place_id, **kwargs):
+    return update_catalog(removed=[place_id], **kwargs)
+
+
+def add_rating(user_id, place_id, rating, **kwargs):
+    return update_catalog(ratings=[(user_id, place_id, rating)], **kwargs)
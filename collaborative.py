@@ -0,0 +1,119 @@
+"""
+Collaborative-filtering recommender, served alongside the content-based one.
+
+The user x item rating matrix is built as a scipy.sparse matrix straight from
+the model's grouped interactions and factorized with a truncated randomized
+SVD, so training memory grows with the number of ratings rather than with
+users x items. Serving a user is one dot product of their factor vector with
+the item factors, followed by the same soft-filter bonuses the content-based
+recommender applies.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.utils.extmath import randomized_svd
+
+import recommender
+from recommender import score_items, top_k_indices, distance_mask, get_user_location, RESULT_COLUMNS
+from spatial_index import haversine_km
+
+# Latent factors kept from the SVD and power iterations used to compute them
+CF_FACTORS = 32
+CF_ITERATIONS = 5
+
+# Added to every rating so places rated 0 still register as an interaction
+CF_RATING_OFFSET = 1.0
+
+# Factors of the most recently served model, retrained when the model is replaced
+_factors = None
+_factors_lock = threading.Lock()
+
+
+def build_rating_matrix(model):
+    """Sparse user x item matrix of offset ratings, rows aligned with model['user_ids']."""
+    n_users, n_items = len(model['user_ids']), len(model['items'])
+    users = np.repeat(np.arange(n_users), np.diff(model['user_indptr']))
+    weights = np.asarray(model['interaction_ratings'], dtype=np.float64) + CF_RATING_OFFSET
+    return csr_matrix((weights, (users, model['interaction_items'])), shape=(n_users, n_items))
+
+
+def train_factors(model, n_factors=CF_FACTORS, n_iter=CF_ITERATIONS, seed=0):
+    """
+    Factorize the rating matrix into user and item factors whose dot product
+    predicts a user's offset rating of an item, divided by the largest offset
+    rating so predictions sit on the same scale as the soft-filter bonuses.
+    """
+    ratings = build_rating_matrix(model)
+    n_factors = max(min(n_factors, min(ratings.shape) - 1), 1)
+    u, s, vt = randomized_svd(ratings, n_factors, n_iter=n_iter, random_state=seed)
+    scale = ratings.data.max() if ratings.nnz else 1.0
+    return {
+        'user_factors': np.ascontiguousarray(u * (s / scale)),
+        'item_factors': np.ascontiguousarray(vt.T),
+    }
+
+
+def get_factors(model):
+    """Factors for `model`, trained on first use and whenever a different model is passed."""
+    global _factors
+    cached = _factors
+    if cached is None or cached[0] is not model:
+        with _factors_lock:
+            cached = _factors
+            if cached is None or cached[0] is not model:
+                cached = _factors = (model, train_factors(model))
+    return cached[1]
+
+
+def recommend(model, user_id, cuisine=None, max_distance=10, min_group_score=0.5, days=None, top_n=10,
+              location=None):
+    """
+    Collaborative recommendations for one user with the content-based
+    recommender's soft filters. Only users with ratings in the model can be
+    served; restaurants added since the factors were trained score no
+    collaborative signal until the model is rebuilt.
+    """
+    items = model['items']
+    user_ids = model['user_ids']
+    u = np.searchsorted(user_ids, str(user_id))
+    if u == len(user_ids) or user_ids[u] != str(user_id):
+        return pd.DataFrame({'error': [f"User ID {user_id} not found."]})
+    if location is None:
+        location = get_user_location(model, user_id)
+
+    factors = get_factors(model)
+    predicted = factors['item_factors'] @ factors['user_factors'][u]
+    sim = np.zeros(len(items))
+    sim[:len(predicted)] = predicted
+
+    within_distance = distance_mask(model, location, max_distance)
+    scores = score_items(model, sim, cuisine, max_distance, min_group_score, days,
+                         within_distance=within_distance)
+    top = top_k_indices(scores, top_n)
+    top = top[np.isfinite(scores[top])]
+
+    top_recs = items.iloc[top].assign(matching_score=scores[top])
+    if location is not None:
+        top_recs['distance_km'] = haversine_km(
+            location[0], location[1], top_recs['rest_latitude'], top_recs['rest_longitude']
+        )
+    return top_recs[RESULT_COLUMNS]
+
+
+def get_collaborative_recommendations(
+    user_id,
+    cuisine=None,
+    max_distance=10,
+    min_group_score=0.5,
+    days=None,
+    top_n=10,
+    location=None
+):
+    """
+    Collaborative-filtering counterpart of
+    recommender.get_soft_filtered_recommendations, with the same filters.
+    """
+    return recommend(recommender.load_model(), user_id, cuisine, max_distance, min_group_score, days,
+                     top_n, location)
@@ -0,0 +1,60 @@
+"""
+Concurrency stress check for the recommender.
+
+Scores a sample of users serially, then replays the same requests shuffled across
+a thread pool and verifies that every concurrent result matches the serial one.
+
+    python concurrency_check.py --users 50 --workers 8 --rounds 10
+"""
+import argparse
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import recommender
+
+# Filter combinations replayed for every sampled user
+FILTER_CASES = [
+    {},
+    {'cuisine': 'mexican', 'max_distance': 5, 'days': ['mon', 'fri']},
+    {'cuisine': 'bar', 'max_distance': 20, 'min_group_score': 0.8, 'top_n': 20},
+]
+
+
+def run_check(n_users=50, workers=8, rounds=10, seed=0):
+    model = recommender.load_model()
+    users = list(model['user_ids'][:n_users])
+    requests = list(itertools.product(users, range(len(FILTER_CASES))))
+
+    expected = {
+        (user_id, case): recommender.recommend(model, user_id, **FILTER_CASES[case])
+        for user_id, case in requests
+    }
+
+    replay = requests * rounds
+    random.Random(seed).shuffle(replay)
+
+    def run(request):
+        user_id, case = request
+        return request, recommender.recommend(model, user_id, **FILTER_CASES[case])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for request, result in pool.map(run, replay):
+            pd.testing.assert_frame_equal(result, expected[request])
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(replay)} concurrent requests on {workers} threads matched the serial results "
+          f"({len(replay) / elapsed:.0f} requests/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress the recommender from a thread pool.")
+    parser.add_argument("--users", type=int, default=50, help="number of users to sample")
+    parser.add_argument("--workers", type=int, default=8, help="thread pool size")
+    parser.add_argument("--rounds", type=int, default=10, help="times each request is replayed")
+    args = parser.parse_args()
+    run_check(args.users, args.workers, args.rounds)
@@ -0,0 +1,103 @@
+"""
+Cuisine tokenization shared by the app and the recommender.
+
+A restaurant's cuisines are the ';'-separated entries of `Rcuisine_x` and
+`Rcuisine_y`, stripped and lower-cased. Each distinct cuisine string is
+tokenized once into ids of an interned token vocabulary, giving a CSR
+restaurant -> tokens matrix and its transpose, a CSR posting list
+token -> restaurants, so filtering by cuisine is a posting-list lookup.
+"""
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+
+def split_cuisines(*values):
+    """Sorted distinct cuisine tokens of one restaurant's cuisine strings."""
+    tokens = set()
+    for value in values:
+        if not pd.isna(value):
+            tokens.update(t.strip().lower() for t in str(value).split(';') if t.strip())
+    return sorted(tokens)
+
+
+def tokenize(rcuisine_x, rcuisine_y=None, vocabulary=None):
+    """
+    (vocabulary, restaurant x token CSR matrix) for the cuisine columns. The
+    vocabulary is sorted unless an existing one is passed, in which case new
+    tokens are appended to it in sorted order.
+    """
+    combined = pd.Series(rcuisine_x).astype(object).fillna('').to_numpy()
+    if rcuisine_y is not None:
+        combined = combined + ';' + pd.Series(rcuisine_y).astype(object).fillna('').to_numpy()
+    codes, uniques = pd.factorize(combined)
+    unique_tokens = [split_cuisines(value) for value in uniques]
+
+    seen = set(chain.from_iterable(unique_tokens))
+    vocabulary = sorted(seen) if vocabulary is None else (
+        list(vocabulary) + sorted(seen - set(vocabulary))
+    )
+    ids = {token: i for i, token in enumerate(vocabulary)}
+
+    # Token ids per distinct string, gathered out to every row
+    lengths = np.array([len(tokens) for tokens in unique_tokens], dtype=np.int64)
+    unique_indptr = np.concatenate([[0], np.cumsum(lengths)])
+    unique_ids = np.array([ids[t] for tokens in unique_tokens for t in tokens], dtype=np.int32)
+    row_lengths = lengths[codes]
+    indptr = np.concatenate([[0], np.cumsum(row_lengths)])
+    offsets = np.repeat(unique_indptr[codes] - indptr[:-1], row_lengths)
+    indices = unique_ids[offsets + np.arange(indptr[-1])]
+
+    matrix = csr_matrix(
+        (np.ones(len(indices), dtype=np.float64), indices, indptr), shape=(len(codes), len(vocabulary))
+    )
+    return vocabulary, matrix
+
+
+def build_postings(matrix):
+    """CSR posting list (indptr, restaurant positions) of every token in a tokenize() matrix."""
+    postings = matrix.tocsc()
+    postings.sort_indices()
+    return postings.indptr.astype(np.int64), postings.indices.astype(np.int64)
+
+
+class CuisineIndex:
+    """Posting-list lookups of the restaurants serving each cuisine token."""
+
+    def __init__(self, vocabulary, indptr, postings):
+        self.vocabulary = list(vocabulary)
+        self._ids = {token: i for i, token in enumerate(self.vocabulary)}
+        self._indptr = indptr
+        self._postings = postings
+
+    @classmethod
+    def from_columns(cls, rcuisine_x, rcuisine_y=None):
+        vocabulary, matrix = tokenize(rcuisine_x, rcuisine_y)
+        return cls(vocabulary, *build_postings(matrix))
+
+    def __contains__(self, token):
+        return str(token).strip().lower() in self._ids
+
+    def rows(self, token):
+        """Sorted positions of the restaurants serving `token` (empty for an unknown token)."""
+        token_id = self._ids.get(str(token).strip().lower())
+        if token_id is None:
+            return self._postings[:0]
+        return self._postings[self._indptr[token_id]:self._indptr[token_id + 1]]
+
+    def serves(self, token, n, positions=None):
+        """
+        Mask of the restaurants serving `token`, over all `n` positions or, when
+        given, over `positions` only (by binary search of the posting list).
+        """
+        rows = self.rows(token)
+        if positions is None:
+            mask = np.zeros(n, dtype=bool)
+            mask[rows] = True
+            return mask
+        if not len(rows):
+            return np.zeros(np.shape(positions), dtype=bool)
+        found = np.minimum(np.searchsorted(rows, positions), len(rows) - 1)
+        return rows[found] == positions
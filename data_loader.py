@@ -0,0 +1,183 @@
+"""
+Typed, columnar copy of processed_data.csv, and a process-wide registry of
+loaded datasets.
+
+The CSV stays the source of truth. The first load after it changes converts
+it to a Parquet file next to it with an explicit schema: dictionary-encoded
+categoricals, booleans for the day flags and float32 scores. Later loads read
+only the columns a consumer asks for.
+"""
+import os
+import hashlib
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# The registry hands out shallow copies, which only keep callers' edits away
+# from the shared frames under copy-on-write (always on from pandas 3)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Dictionary-encoded string columns (pandas categoricals once loaded). userID
+# stays a plain string column: the recommender relies on sorting its values.
+CATEGORICAL_COLUMNS = [
+    'alcohol', 'smoking_area', 'dress_code', 'accessibility', 'price',
+    'Rambience', 'franchise', 'area', 'other_services', 'Rcuisine_x', 'Rcuisine_y', 'hours'
+]
+FLOAT32_COLUMNS = [
+    'rating', 'food_rating', 'service_rating',
+    'distance_km', 'popularity_score_scaled', 'food_rating_scaled',
+    'service_rating_scaled', 'trending_score', 'group_friendly_score', 'avg_rating'
+]
+# Coordinates keep full precision so distances are unchanged
+FLOAT64_COLUMNS = ['rest_latitude', 'rest_longitude']
+INT_COLUMNS = ['placeID']
+DAY_PREFIX = 'days_'
+
+# Written into the Parquet metadata so a changed CSV is noticed without hashing it
+SOURCE_KEY = b'source_csv'
+# Bumped whenever the schema above changes, so existing Parquet copies are redone
+SCHEMA_VERSION = 2
+
+
+def fingerprint_file(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def column_type(name):
+    """Arrow type of a processed_data.csv column, or None to keep the inferred one."""
+    if name in CATEGORICAL_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if name in FLOAT32_COLUMNS:
+        return pa.float32()
+    if name in FLOAT64_COLUMNS:
+        return pa.float64()
+    if name in INT_COLUMNS:
+        return pa.int64()
+    if name.startswith(DAY_PREFIX):
+        return pa.bool_()
+    return None
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{SCHEMA_VERSION}".encode()
+
+
+def convert_csv(csv_path, path=None):
+    """Write the typed Parquet copy of `csv_path` and return its path."""
+    path = path or parquet_path(csv_path)
+    stamp = _source_stamp(csv_path)
+    data = pd.read_csv(csv_path, low_memory=False)
+
+    fields = []
+    for name in data.columns:
+        arrow_type = column_type(name)
+        if arrow_type is None:
+            arrow_type = pa.Schema.from_pandas(data[[name]], preserve_index=False).field(name).type
+        elif pa.types.is_dictionary(arrow_type):
+            data[name] = data[name].astype('string')
+        elif pa.types.is_boolean(arrow_type):
+            data[name] = data[name].fillna(0).astype(bool)  # a missing day flag means closed
+        fields.append(pa.field(name, arrow_type))
+
+    schema = pa.schema(fields, metadata={SOURCE_KEY: stamp})
+    table = pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def is_current(csv_path, path=None):
+    """Whether the Parquet copy exists and was written from the CSV as it is now."""
+    path = path or parquet_path(csv_path)
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return not os.path.exists(csv_path) or metadata.get(SOURCE_KEY) == _source_stamp(csv_path)
+
+
+def ensure_parquet(csv_path):
+    """Path of an up-to-date Parquet copy of `csv_path`, converting it if needed."""
+    path = parquet_path(csv_path)
+    if not is_current(csv_path, path):
+        convert_csv(csv_path, path)
+    return path
+
+
+def load_processed(csv_path, columns=None):
+    """
+    The processed data with its typed schema. Only `columns` are read when
+    given; names that end in '*' select every column with that prefix.
+    """
+    path = ensure_parquet(csv_path)
+    if columns is not None:
+        names = pq.read_schema(path).names
+        selected = []
+        for column in columns:
+            matches = [n for n in names if n.startswith(column[:-1])] if column.endswith('*') else [column]
+            selected.extend(n for n in matches if n in names and n not in selected)
+        columns = selected
+    return pd.read_parquet(path, columns=columns)
+
+
+class DatasetRegistry:
+    """
+    Datasets loaded once per process and shared by every caller. A dataset is
+    reloaded only when its file changes: a new size or mtime triggers a hash
+    of the file, and only a new hash triggers a reload. Callers get shallow
+    copies; copy-on-write (enabled above) keeps their edits off the shared frame.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, loader):
+        """Serve `loader(path)` as `name`; registering the same name again replaces its source."""
+        with self._lock:
+            if self._sources.get(name, (None,))[0] != path:
+                self._entries.pop(name, None)
+            self._sources[name] = (path, loader)
+
+    def _entry(self, name):
+        path, loader = self._sources[name]
+        stat = os.stat(path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        entry = self._entries.get(name)
+        if entry is None or entry['stamp'] != stamp:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is None or entry['stamp'] != stamp:
+                    digest = fingerprint_file(path)
+                    if entry is None or entry['digest'] != digest:
+                        entry = {'frame': loader(path), 'digest': digest, 'stamp': stamp}
+                    else:
+                        entry = dict(entry, stamp=stamp)
+                    self._entries[name] = entry
+        return entry
+
+    def get(self, name):
+        """A read-only view of the dataset, reloading it first if its file changed."""
+        return self._entry(name)['frame'].copy(deep=False)
+
+    def version(self, name):
+        """Content hash of the dataset currently served, for keying caches derived from it."""
+        return self._entry(name)['digest']
+
+
+datasets = DatasetRegistry()
@@ -0,0 +1,199 @@
+"""
+Inverted filter index over the restaurant rows the app filters.
+
+Built once per version of the data: a cuisine posting list, a packed bitmap
+per day of the week and per value of the categorical filter columns, and sorted
+arrays for the numeric filter columns, so range predicates are binary
+searches. A query intersects bitmaps and takes a partial top-k, returning row
+positions without copying the frame.
+"""
+import numpy as np
+import pandas as pd
+
+from spatial_index import SpatialIndex
+from schedule import DAYS, DAY_FLAG, day_index, hour_bits, compile_hours, compile_schedules, query_mask, is_open
+from cuisines import CuisineIndex
+
+# Columns with a bitmap per distinct value, and numeric columns with a sorted array
+VALUE_COLUMNS = ['price', 'alcohol', 'area']
+RANGE_COLUMNS = ['distance_km', 'group_friendly_score', 'avg_rating']
+# The restaurant columns the app and the recommendation service filter on or show
+RESTAURANT_COLUMNS = [
+    'placeID', 'name', 'Rcuisine_x', 'avg_rating', 'group_friendly_score', 'distance_km',
+    'rest_latitude', 'rest_longitude', 'hours', 'days_*', 'price', 'alcohol', 'area', 'Rcuisine_y'
+]
+
+
+class FilterIndex:
+    """
+    Bitmaps and sorted arrays over the rows of `frame`. Bitmaps are np.packbits
+    arrays, one bit per row; every query method returns one.
+    """
+
+    def __init__(self, frame):
+        self._n = len(frame)
+        self._place_ids = pd.Index(frame['placeID'].unique())
+        self._row_places = self._place_ids.get_indexer(frame['placeID'])
+        self._empty = np.packbits(np.zeros(self._n, dtype=bool))
+
+        self._values = {}
+        for column in VALUE_COLUMNS:
+            if column in frame.columns:
+                codes, uniques = pd.factorize(frame[column])
+                self._values[column] = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+
+        # Every cuisine token of Rcuisine_x and Rcuisine_y, with the rows serving it
+        self._cuisines = CuisineIndex.from_columns(frame['Rcuisine_x'], frame.get('Rcuisine_y'))
+
+        # Schedules are compiled per place (over all of its rows) and expanded to rows
+        self._schedules = compile_schedules(frame, self._place_ids)[self._row_places]
+        self._days = [np.packbits(self._schedules[:, d] & DAY_FLAG != 0) for d in range(len(DAYS))]
+        # Hours of each place on any day, for time queries without a day (places may have no day flags)
+        place_hours = np.zeros(len(self._place_ids), dtype=np.uint32)
+        np.bitwise_or.at(place_hours, self._row_places, compile_hours(frame))
+        self._hours = place_hours[self._row_places]
+
+        # Values keep their stored dtype so thresholds compare exactly as in pandas
+        self._sorted = {}
+        self._row_values = {}
+        for column in RANGE_COLUMNS:
+            if column in frame.columns:
+                values = frame[column].to_numpy()
+                values = values if np.issubdtype(values.dtype, np.floating) else values.astype(np.float64)
+                self._row_values[column] = values
+                order = np.argsort(values, kind='stable')
+                order = order[~np.isnan(values[order])]
+                self._sorted[column] = (order, values[order])
+
+    def __len__(self):
+        return self._n
+
+    def _from_positions(self, positions):
+        mask = np.zeros(self._n, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def all(self):
+        return np.packbits(np.ones(self._n, dtype=bool))
+
+    def equals(self, column, value):
+        """Rows whose `column` is exactly `value`."""
+        return self._values[column].get(value, self._empty)
+
+    @property
+    def cuisines(self):
+        """Every cuisine token, sorted."""
+        return self._cuisines.vocabulary
+
+    def cuisine(self, token):
+        """Rows serving the cuisine `token` anywhere in their cuisine lists."""
+        return self._from_positions(self._cuisines.rows(token))
+
+    def open_during(self, days=None, hours=None):
+        """
+        Rows open on any of `days` (during `hours`, (start, end), when given).
+        With hours but no days, a row matches on its hours alone.
+        """
+        if hours is None:
+            indices = range(len(DAYS)) if days is None else [d for d in map(day_index, days) if d is not None]
+            return np.bitwise_or.reduce([self._days[d] for d in indices] + [self._empty])
+        if days is None:
+            return np.packbits(self._hours & np.uint32(hour_bits(*hours)) != 0)
+        return np.packbits(is_open(self._schedules, query_mask(days, hours)))
+
+    def at_least(self, column, low):
+        """Rows with `column` >= `low`, found by binary search."""
+        order, values = self._sorted[column]
+        # The threshold takes the column's dtype so it compares as in pandas
+        return self._from_positions(order[np.searchsorted(values, values.dtype.type(low), side='left'):])
+
+    def at_most(self, column, high):
+        """Rows with `column` <= `high`, found by binary search."""
+        order, values = self._sorted[column]
+        return self._from_positions(order[:np.searchsorted(values, values.dtype.type(high), side='right')])
+
+    def places(self, place_ids):
+        """Rows of any of `place_ids`."""
+        place_mask = np.zeros(len(self._place_ids), dtype=bool)
+        positions = self._place_ids.get_indexer(place_ids)
+        place_mask[positions[positions >= 0]] = True
+        return np.packbits(place_mask[self._row_places])
+
+    def intersect(self, bitmaps):
+        """Rows set in every one of `bitmaps`."""
+        return np.bitwise_and.reduce(list(bitmaps)) if bitmaps else self.all()
+
+    def positions(self, bitmap):
+        return np.flatnonzero(np.unpackbits(bitmap, count=self._n))
+
+    def select(self, top_n, cuisine=None, max_distance=None, min_group_score=None, min_rating=None,
+               days=None, hours=None, place_ids=None):
+        """
+        Positions of the (at most) `top_n` best-rated rows passing the app's
+        sidebar filters; None (or cuisine 'Any') leaves a filter out.
+        `place_ids`, the places within reach of the user, replaces the stored
+        distance_km filter when given. Day and time apply when either is set.
+        """
+        bitmaps = []
+        if min_group_score is not None:
+            bitmaps.append(self.at_least('group_friendly_score', min_group_score))
+        if min_rating is not None:
+            bitmaps.append(self.at_least('avg_rating', min_rating))
+        if cuisine is not None and cuisine != 'Any':
+            bitmaps.append(self.cuisine(cuisine))
+        if place_ids is not None:
+            bitmaps.append(self.places(place_ids))
+        elif max_distance is not None:
+            bitmaps.append(self.at_most('distance_km', max_distance))
+        if days is not None or hours is not None:
+            bitmaps.append(self.open_during(days, hours))
+        return self.top_k(self.intersect(bitmaps), top_n)
+
+    def top_k(self, bitmap, k, column='avg_rating'):
+        """
+        Positions of the (at most) `k` rows in `bitmap` with the highest
+        `column`, highest first; ties keep row order.
+        """
+        positions = self.positions(bitmap)
+        values = self._row_values[column][positions]
+        if len(positions) > k:
+            if k <= 0:
+                return positions[:0]
+            # Everything tied with the k-th highest value is kept so ties resolve by row order
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            positions, values = positions[values >= kth], values[values >= kth]
+        return positions[np.lexsort((positions, -values))][:k]
+
+
+class RestaurantFilter:
+    """
+    The app's sidebar filtering over the restaurant rows of `frame`, shared by
+    the app and the recommendation service: a FilterIndex over every row and
+    a spatial index over one row per place for distances from the user.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.index = FilterIndex(frame)
+        self.restaurants = frame.drop_duplicates('placeID').reset_index(drop=True)
+        self.spatial = SpatialIndex(self.restaurants['rest_latitude'], self.restaurants['rest_longitude'])
+
+    def distances_within(self, location, radius_km):
+        """Distance (km) from `location` of each place within `radius_km`, by placeID."""
+        latitude, longitude = location
+        return self.spatial.distances_within(self.restaurants['placeID'].to_numpy(), latitude, longitude, radius_km)
+
+    def select(self, top_n, location=None, max_distance=None, **filters):
+        """
+        Rows of the (at most) `top_n` best-rated restaurants passing the
+        filters of FilterIndex.select. With `location`, `max_distance` and the
+        returned distance_km are measured from it instead of the stored
+        distances.
+        """
+        distances = None if location is None else self.distances_within(location, max_distance)
+        rows = self.index.select(top_n, max_distance=max_distance,
+                                 place_ids=None if distances is None else distances.index, **filters)
+        result = self.frame.iloc[rows]
+        if distances is not None:
+            result = result.assign(distance_km=result['placeID'].map(distances))
+        return result
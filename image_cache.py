@@ -0,0 +1,130 @@
+"""
+Cuisine image manifest and thumbnail cache for `restaurant_images`.
+
+The image folders are scanned once into a manifest of cuisine -> image paths
+(cuisine names lower-cased, as the app looks them up). Every image gets a
+resized, recompressed JPEG thumbnail in a content-addressed cache directory:
+a thumbnail's name is the hash of its source file plus the thumbnail settings,
+so edited images get new thumbnails and unchanged ones are never redone.
+Missing thumbnails are generated in a process pool.
+
+    python image_cache.py            # pre-generate every thumbnail
+"""
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from data_loader import fingerprint_file
+
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg')
+# Bounding box of a thumbnail (the aspect ratio is kept) and its JPEG quality
+THUMBNAIL_SIZE = (480, 360)
+THUMBNAIL_QUALITY = 80
+
+
+def build_manifest(image_folder):
+    """Sorted image paths of every cuisine folder under `image_folder`, keyed by lower-cased cuisine."""
+    manifest = {}
+    if not os.path.isdir(image_folder):
+        return manifest
+    with os.scandir(image_folder) as folders:
+        for folder in folders:
+            if folder.is_dir() and not folder.name.startswith('.'):
+                with os.scandir(folder.path) as files:
+                    paths = sorted(f.path for f in files if f.is_file() and f.name.lower().endswith(IMAGE_EXTENSIONS))
+                manifest.setdefault(folder.name.lower(), []).extend(paths)
+    return manifest
+
+
+def thumbnail_name(digest, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Cache file name of the thumbnail of an image whose content hash is `digest`."""
+    return f"{digest}_{size[0]}x{size[1]}_q{quality}.jpg"
+
+
+def make_thumbnail(job):
+    """Write one thumbnail; `job` is (source path, thumbnail path, size, quality) so it pickles for the pool."""
+    source, target, size, quality = job
+    tmp_path = target + '.tmp'
+    with Image.open(source) as image:
+        fits = image.format == 'JPEG' and image.width <= size[0] and image.height <= size[1]
+        image.draft('RGB', size)  # lets JPEG decoding downscale large originals directly
+        image = image.convert('RGB')
+        image.thumbnail(size, Image.LANCZOS)
+        image.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    # A small JPEG original is often smaller than its re-encoding; keep whichever is
+    if fits and os.path.getsize(source) <= os.path.getsize(tmp_path):
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+class ImageCache:
+    """
+    Thumbnails of the cuisine images. `build()` scans the folders and fills the
+    cache; lookups afterwards touch only the in-memory manifest.
+    """
+
+    def __init__(self, image_folder, cache_folder, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+        self.image_folder = image_folder
+        self.cache_folder = cache_folder
+        self.size = tuple(size)
+        self.quality = quality
+        self._thumbnails = {}
+        self.generated = 0
+
+    def build(self, workers=None):
+        """Scan the image folders and generate any missing thumbnails; returns self."""
+        os.makedirs(self.cache_folder, exist_ok=True)
+        manifest = build_manifest(self.image_folder)
+        cached = set(os.listdir(self.cache_folder))
+
+        thumbnails, jobs = {}, []
+        for cuisine, paths in manifest.items():
+            thumbnails[cuisine] = []
+            for path in paths:
+                name = thumbnail_name(fingerprint_file(path), self.size, self.quality)
+                target = os.path.join(self.cache_folder, name)
+                if name not in cached:
+                    jobs.append((path, target, self.size, self.quality))
+                    cached.add(name)  # identical images share one thumbnail
+                thumbnails[cuisine].append(target)
+
+        if len(jobs) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(make_thumbnail, jobs))
+        else:
+            for job in jobs:
+                make_thumbnail(job)
+
+        self._thumbnails = thumbnails
+        self.generated = len(jobs)
+        return self
+
+    def __contains__(self, cuisine):
+        return str(cuisine).strip().lower() in self._thumbnails
+
+    def cuisines(self):
+        """Cuisines with at least one image."""
+        return [cuisine for cuisine, paths in self._thumbnails.items() if paths]
+
+    def thumbnails(self, cuisine):
+        """Thumbnail paths of a cuisine's images (empty if it has none)."""
+        return self._thumbnails.get(str(cuisine).strip().lower(), [])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate the thumbnail cache for restaurant_images.")
+    parser.add_argument("--images", default="restaurant_images")
+    parser.add_argument("--cache", default="thumbnail_cache")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cache = ImageCache(args.images, args.cache).build(workers=args.workers)
+    print(f"{cache.generated} thumbnails generated for {len(cache.cuisines())} cuisines "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -1,59 +1,926 @@
+import os
+import json
+import shutil
+import contextlib
+import hashlib
+import argparse
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import fcntl
+except ImportError:  # no cross-process build lock where flock is unavailable
+    fcntl = None
+import joblib
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, MinMaxScaler, MultiLabelBinarizer
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, MinMaxScaler, MultiLabelBinarizer, normalize
 from sklearn.cluster import DBSCAN
-from sklearn.metrics.pairwise import cosine_similarity
-from itertools import chain
-
-# Load the preprocessed data
-data = pd.read_csv('processed_data.csv', low_memory=False, dtype={'column_name': str})
-
-# DBSCAN Clustering for location
-location_data = data[['rest_latitude', 'rest_longitude']].dropna()
-scaler = StandardScaler()
-location_scaled = scaler.fit_transform(location_data)
-db = DBSCAN(eps=0.5, min_samples=5).fit(location_scaled)
-data['location_cluster'] = -1
-data.loc[location_data.index, 'location_cluster'] = db.labels_
-
-# Handle cuisine as multilabel and clean duplicates
-data['combined_cuisine'] = data['Rcuisine_x'].fillna('') + ';' + data['Rcuisine_y'].fillna('')
-data['combined_cuisine'] = data['combined_cuisine'].apply(
-    lambda x: list(set(i.strip().lower() for i in x.split(';') if i.strip()))
-)
+from spatial_index import SpatialIndex, haversine_km
+import data_loader
+from data_loader import fingerprint_file
+import schedule
+import cuisines
+
+# Source data and prebuilt model bundle locations
+DATA_PATH = 'processed_data.csv'
+USER_PROFILE_PATH = os.path.join('data', 'userprofile.csv')
+BUNDLE_DIR = 'model_bundle'
+BUNDLE_VERSION = 12
+
+# DBSCAN parameters for the location clusters, in standardized lat/lon units
+DBSCAN_EPS = 0.5
+DBSCAN_MIN_SAMPLES = 5
+
+# Size of the precomputed neighbour lists, and the working memory of one block of
+# rows while building them (rows per block follow from the catalogue size)
+NEIGHBOR_K = 50
+NEIGHBOR_BLOCK_BYTES = 256 << 20
 
-mlb = MultiLabelBinarizer()
-cuisine_encoded = pd.DataFrame(mlb.fit_transform(data['combined_cuisine']), columns=mlb.classes_)
+# Approximate search: inverted lists per catalogue (default sqrt(n)), k-means
+# iterations when training them, and lists probed per query (the recall/latency knob)
+ANN_N_LISTS = None
+ANN_TRAIN_ITERATIONS = 10
+ANN_N_PROBE = 8
 
-# Extract all available cuisines
-available_cuisines = sorted(set(chain.from_iterable(data['combined_cuisine'])))
+# Added to every rating when weighting a user's rated places into their profile,
+# so places rated 0 still count a little
+PROFILE_RATING_OFFSET = 1.0
+
+# Users scored per matrix product in batch recommendations
+BATCH_CHUNK_SIZE = 256
+
+# Places the two-stage search re-ranks per request, shared between its candidate generators
+CANDIDATE_BUDGET = 300
 
-# Encode categorical variables
 categorical_features = [
     'alcohol', 'smoking_area', 'dress_code', 'accessibility', 'price',
     'Rambience', 'franchise', 'area', 'other_services'
 ]
-encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-encoded_cats = pd.DataFrame(
-    encoder.fit_transform(data[categorical_features]),
-    columns=encoder.get_feature_names_out(categorical_features)
-)
-
-# Scale numerical features
 numerical_features = [
     'distance_km', 'popularity_score_scaled', 'food_rating_scaled',
     'service_rating_scaled', 'trending_score', 'group_friendly_score', 'avg_rating'
 ]
-scaler2 = MinMaxScaler()
-scaled_numerics = pd.DataFrame(
-    scaler2.fit_transform(data[numerical_features]),
-    columns=numerical_features
+
+# Per-rating columns of the processed data; everything else describes the restaurant
+interaction_columns = ['userID', 'rating', 'food_rating', 'service_rating']
+
+# Columns of the processed data the model is built from ('days_*' is every day flag)
+model_columns = (
+    interaction_columns + ['placeID', 'name', 'Rcuisine_x', 'Rcuisine_y', 'rest_latitude', 'rest_longitude']
+    + categorical_features + numerical_features + ['hours', 'days_*']
 )
 
-# Content-based feature matrix and cosine similarity
-content_features_matrix = pd.concat([cuisine_encoded, encoded_cats, scaled_numerics], axis=1)
-cosine_sim_matrix = cosine_similarity(content_features_matrix)
-data = data.reset_index(drop=True)
+# Derived when a model is loaded rather than saved with it
+RUNTIME_ARTIFACTS = ['neighbors', 'user_profiles', 'popular_order', 'cuisine_index', 'fingerprint']
+
+# Bundle members stored as .npy files so they can be memory-mapped on load
+ARRAY_ARTIFACTS = [
+    'content_features_matrix', 'normalized_features', 'location_cluster', 'active', 'open_hours',
+    'cuisine_indptr', 'cuisine_postings',
+    'neighbor_indptr', 'neighbor_indices', 'neighbor_sims',
+    'user_ids', 'user_indptr', 'interaction_items', 'interaction_ratings', 'user_profile_sums',
+    'ivf_centroids', 'ivf_indptr', 'ivf_items',
+    'user_latitudes', 'user_longitudes',
+    'shard_labels', 'shard_indptr', 'shard_bounds', 'core_points', 'core_labels'
+]
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def fingerprint_sources(*paths):
+    """Combined fingerprint of the source files that exist among `paths`."""
+    digests = [fingerprint_file(path) for path in paths if os.path.exists(path)]
+    return digests[0] if len(digests) == 1 else hashlib.sha256("".join(digests).encode()).hexdigest()
+
+
+def block_rows(n_columns, bytes_per_row_value, block_bytes):
+    """Rows per block so that `n_columns` values of `bytes_per_row_value` bytes per row fit in `block_bytes`."""
+    return max(1, block_bytes // max(n_columns * bytes_per_row_value, 1))
+
+
+def build_neighbor_graph(normalized_features, k=NEIGHBOR_K, block_bytes=NEIGHBOR_BLOCK_BYTES):
+    """
+    Top-k most similar items for every item as a CSR matrix (rows sorted by
+    descending similarity). Similarities are computed a block of rows at a
+    time, sized so a block's similarities and partition indices stay within
+    `block_bytes` instead of n x n.
+    """
+    n = normalized_features.shape[0]
+    k = max(min(k, n - 1), 0)
+    indices = np.empty((n, k), dtype=np.int32)
+    sims = np.empty((n, k), dtype=np.float32)
+    # Per row: one similarity per item and one argpartition index per item
+    block_size = block_rows(n, normalized_features.dtype.itemsize + np.dtype(np.intp).itemsize, block_bytes)
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        block = normalized_features[start:end] @ normalized_features.T
+        block[np.arange(end - start), np.arange(start, end)] = -np.inf  # an item is not its own neighbour
+        if k == 0:
+            continue
+        top = np.argpartition(block, n - k, axis=1)[:, n - k:]
+        top_sims = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind='stable')
+        indices[start:end] = np.take_along_axis(top, order, axis=1)
+        sims[start:end] = np.take_along_axis(top_sims, order, axis=1)
+
+    indptr = np.arange(0, n * k + 1, k, dtype=np.int64) if k else np.zeros(n + 1, dtype=np.int64)
+    return csr_matrix((sims.ravel(), indices.ravel(), indptr), shape=(n, n))
+
+
+def build_interactions(data, items):
+    """
+    Compact (user, item, rating) arrays from the rating-level data, grouped by user
+    so a user's history is the slice user_indptr[u]:user_indptr[u + 1].
+    """
+    data = data[data['userID'].notna()]
+    # Plain strings, so user_ids is in lexical order (lookups binary-search it)
+    # whatever dtype the column was loaded with
+    user_codes, user_ids = pd.factorize(data['userID'].astype(str).to_numpy(), sort=True)
+    order = np.argsort(user_codes, kind='stable')
+    item_positions = pd.Index(items['placeID']).get_indexer(data['placeID'])
+
+    return {
+        'user_ids': np.asarray(user_ids, dtype=str),
+        'user_indptr': np.concatenate([[0], np.cumsum(np.bincount(user_codes, minlength=len(user_ids)))]),
+        'interaction_items': item_positions[order].astype(np.int32),
+        'interaction_ratings': data['rating'].to_numpy(dtype=np.float32)[order],
+    }
+
+
+def build_user_profiles(interactions, normalized_features):
+    """Rating-weighted sum of the normalized feature vectors of every place each user rated."""
+    n_users = len(interactions['user_ids'])
+    users = np.repeat(np.arange(n_users), np.diff(interactions['user_indptr']))
+    weights = interactions['interaction_ratings'].astype(np.float64) + PROFILE_RATING_OFFSET
+    ratings = csr_matrix(
+        (weights, (users, interactions['interaction_items'])),
+        shape=(n_users, len(normalized_features))
+    )
+    return np.asarray(ratings @ normalized_features)
+
+
+def assign_to_centroids(normalized_features, centroids, block_bytes=NEIGHBOR_BLOCK_BYTES):
+    """Most similar centroid for every row, computed in blocks of at most `block_bytes`."""
+    assignments = np.empty(len(normalized_features), dtype=np.int32)
+    block_size = block_rows(len(centroids), normalized_features.dtype.itemsize, block_bytes)
+    for start in range(0, len(normalized_features), block_size):
+        block = normalized_features[start:start + block_size] @ centroids.T
+        assignments[start:start + block_size] = np.argmax(block, axis=1)
+    return assignments
+
+
+def build_ivf_index(normalized_features, n_lists=ANN_N_LISTS, iterations=ANN_TRAIN_ITERATIONS, seed=0):
+    """
+    IVF-style coarse quantizer for approximate search: spherical k-means centroids
+    and, per centroid, the positions of the items assigned to it (CSR layout:
+    list c holds ivf_items[ivf_indptr[c]:ivf_indptr[c + 1]]).
+    """
+    n = len(normalized_features)
+    n_lists = min(n_lists or max(int(np.sqrt(n)), 1), max(n, 1))
+    rng = np.random.default_rng(seed)
+    centroids = np.array(normalized_features[rng.choice(n, n_lists, replace=False)]) if n else np.zeros((0, 0))
+
+    for _ in range(iterations if n else 0):
+        assignments = assign_to_centroids(normalized_features, centroids)
+        members = csr_matrix((np.ones(n), (assignments, np.arange(n))), shape=(n_lists, n))
+        sums = np.asarray(members @ normalized_features)
+        filled = np.linalg.norm(sums, axis=1) > 0   # empty lists keep their old centroid
+        centroids[filled] = normalize(sums[filled])
+
+    assignments = assign_to_centroids(normalized_features, centroids) if n else np.zeros(0, dtype=np.int32)
+    return {
+        'ivf_centroids': centroids,
+        'ivf_indptr': np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]),
+        'ivf_items': np.argsort(assignments, kind='stable').astype(np.int32),
+    }
+
+
+def ann_candidates(model, profile, n_probe=ANN_N_PROBE):
+    """Positions of the items in the `n_probe` inverted lists closest to `profile`, ascending."""
+    probe = top_k_indices(model['ivf_centroids'] @ profile, n_probe)
+    indptr = model['ivf_indptr']
+    lists = [model['ivf_items'][indptr[c]:indptr[c + 1]] for c in probe]
+    return np.sort(np.concatenate(lists)) if lists else np.array([], dtype=np.int32)
+
+
+class UserProfileCache:
+    """
+    One aggregate feature vector per user. Vectors built with the bundle are read
+    from it; ratings that arrive later are folded in incrementally and kept in a
+    small overlay, so the shared bundle arrays are never written.
+    """
+
+    def __init__(self, user_ids, profile_sums, normalized_features, place_ids):
+        self._user_ids = user_ids
+        self._profile_sums = profile_sums
+        self._features = normalized_features
+        self._place_index = pd.Index(place_ids)
+        self._overlay = {}
+        self._lock = threading.Lock()
+
+    def rebase(self, user_ids, profile_sums, normalized_features, place_ids):
+        """
+        A cache over an updated model that keeps this cache's overlay, padding
+        overlay vectors with zeros for feature columns added since.
+        """
+        cache = UserProfileCache(user_ids, profile_sums, normalized_features, place_ids)
+        width = normalized_features.shape[1]
+        with self._lock:
+            cache._overlay = {
+                user_id: np.pad(profile, (0, width - len(profile)))
+                for user_id, profile in self._overlay.items()
+            }
+        return cache
+
+    def _profile_sum(self, user_id):
+        # Callers hold the lock
+        if user_id in self._overlay:
+            return self._overlay[user_id]
+        u = np.searchsorted(self._user_ids, user_id)
+        if u < len(self._user_ids) and self._user_ids[u] == user_id:
+            return self._profile_sums[u]
+        return None
+
+    def __contains__(self, user_id):
+        with self._lock:
+            return self._profile_sum(str(user_id)) is not None
+
+    def has_overlay(self, user_id):
+        """Whether the user's profile has ratings folded in since the bundle was built."""
+        with self._lock:
+            return str(user_id) in self._overlay
+
+    def vector(self, user_id):
+        """The user's unit-length profile vector, or None for an unknown user."""
+        with self._lock:
+            profile = self._profile_sum(str(user_id))
+        if profile is None:
+            return None
+        norm = np.linalg.norm(profile)
+        return profile / norm if norm else np.array(profile)
+
+    def add_rating(self, user_id, place_id, rating, previous_rating=None):
+        """
+        Fold a new rating into the user's profile. When a user re-rates a place,
+        pass the old value as `previous_rating` so it is replaced, not added again.
+        """
+        position = self._place_index.get_indexer([place_id])[0]
+        if position < 0:
+            raise KeyError(f"Place ID {place_id} not found.")
+        weight = rating + PROFILE_RATING_OFFSET
+        if previous_rating is not None:
+            weight -= previous_rating + PROFILE_RATING_OFFSET
+
+        user_id = str(user_id)
+        with self._lock:
+            profile = self._profile_sum(user_id)
+            if profile is None:
+                profile = np.zeros(self._features.shape[1])
+            self._overlay[user_id] = profile + weight * self._features[position]
+
+
+def build_user_locations(user_ids, user_profiles):
+    """Home latitude/longitude of each user (NaN when unknown), aligned with `user_ids`."""
+    if user_profiles is None:
+        missing = np.full(len(user_ids), np.nan)
+        return {'user_latitudes': missing, 'user_longitudes': missing.copy()}
+    locations = user_profiles.drop_duplicates('userID').set_index('userID').reindex(user_ids)
+    return {
+        'user_latitudes': locations['latitude'].to_numpy(dtype=np.float64),
+        'user_longitudes': locations['longitude'].to_numpy(dtype=np.float64),
+    }
+
+
+def build_location_shards(items):
+    """
+    Shard table for a catalogue sorted by location cluster: each cluster's label,
+    its contiguous slice shard_indptr[s]:shard_indptr[s + 1] and its bounding box
+    (min/max latitude, min/max longitude; NaN when no member has a location).
+    """
+    labels, starts = np.unique(items['location_cluster'].to_numpy(), return_index=True)
+    indptr = np.append(starts, len(items))
+    latitudes = items['rest_latitude'].to_numpy(dtype=np.float64)
+    longitudes = items['rest_longitude'].to_numpy(dtype=np.float64)
+
+    bounds = np.full((len(labels), 4), np.nan)
+    for s in range(len(labels)):
+        lat, lon = latitudes[indptr[s]:indptr[s + 1]], longitudes[indptr[s]:indptr[s + 1]]
+        located = ~(np.isnan(lat) | np.isnan(lon))
+        if located.any():
+            bounds[s] = lat[located].min(), lat[located].max(), lon[located].min(), lon[located].max()
+    return {'shard_labels': labels, 'shard_indptr': indptr, 'shard_bounds': bounds}
+
+
+def build_model(data, user_profiles=None):
+    """
+    Split the processed data into a unique-restaurant catalogue and a ratings
+    table, then fit the location clusters, cuisine/categorical encoders and
+    numeric scaler on the catalogue and return every artifact the recommender needs.
+    `user_profiles` (the userprofile.csv table) supplies home locations for
+    per-user distances.
+
+    The catalogue is ordered by location cluster, so every cluster is a
+    contiguous shard of the feature matrix.
+    """
+    data = data.reset_index(drop=True)
+    items = (
+        data.drop_duplicates('placeID')
+        .drop(columns=[c for c in interaction_columns if c in data.columns])
+        .reset_index(drop=True)
+    )
+    # Categorical columns of the typed data become plain objects, so catalogue
+    # updates can set values the data has not seen yet
+    items = items.astype({c: object for c in items.select_dtypes('category').columns})
+
+    # DBSCAN Clustering for location, weighting each restaurant by its number of
+    # ratings so densities match clustering the rating-level rows
+    ratings_per_item = items['placeID'].map(data['placeID'].value_counts()).to_numpy()
+    location_data = items[['rest_latitude', 'rest_longitude']].dropna()
+    scaler = StandardScaler()
+    location_scaled = scaler.fit_transform(location_data)
+    db = DBSCAN(eps=DBSCAN_EPS, min_samples=DBSCAN_MIN_SAMPLES).fit(
+        location_scaled, sample_weight=ratings_per_item[location_data.index]
+    )
+    items['location_cluster'] = -1
+    items.loc[location_data.index, 'location_cluster'] = db.labels_
+    items = items.sort_values('location_cluster', kind='stable').reset_index(drop=True)
+    shards = build_location_shards(items)
+
+    interactions = build_interactions(data, items)
+    open_hours = schedule.compile_schedules(data, items['placeID'])
+    user_locations = build_user_locations(interactions['user_ids'], user_profiles)
+
+    # Handle cuisine as multilabel: each distinct cuisine string is tokenized once
+    # into the token vocabulary, with a posting list of the places serving each token
+    cuisine_vocabulary, cuisine_matrix = cuisines.tokenize(items['Rcuisine_x'], items['Rcuisine_y'])
+    cuisine_indptr, cuisine_postings = cuisines.build_postings(cuisine_matrix)
+    tokens = np.array(cuisine_vocabulary, dtype=object)
+    items['combined_cuisine'] = [list(row) for row in np.split(tokens[cuisine_matrix.indices], cuisine_matrix.indptr[1:-1])]
+
+    mlb = MultiLabelBinarizer(classes=cuisine_vocabulary).fit([])
+    cuisine_encoded = pd.DataFrame(cuisine_matrix.toarray(), columns=cuisine_vocabulary)
+
+    # Extract all available cuisines
+    available_cuisines = list(cuisine_vocabulary)
+
+    # Encode categorical variables
+    encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
+    encoded_cats = pd.DataFrame(
+        encoder.fit_transform(items[categorical_features]),
+        columns=encoder.get_feature_names_out(categorical_features)
+    )
+
+    # Scale numerical features
+    scaler2 = MinMaxScaler()
+    scaled_numerics = pd.DataFrame(
+        scaler2.fit_transform(items[numerical_features]),
+        columns=numerical_features
+    )
+
+    # Content-based feature matrix, unit-normalized so cosine similarity is a dot product.
+    # The column maps let incremental updates encode new rows and add columns.
+    content_features = pd.concat([cuisine_encoded, encoded_cats, scaled_numerics], axis=1)
+    n_cuisines, n_categories = cuisine_encoded.shape[1], encoded_cats.shape[1]
+    cuisine_columns = {token: i for i, token in enumerate(cuisine_vocabulary)}
+    category_keys = [
+        (feature, None if pd.isna(value) else value)
+        for feature, values in zip(categorical_features, encoder.categories_) for value in values
+    ]
+    category_columns = {key: n_cuisines + i for i, key in enumerate(category_keys)}
+    numeric_columns = {name: n_cuisines + n_categories + i for i, name in enumerate(numerical_features)}
+    content_features_matrix = content_features.to_numpy(dtype=np.float64)
+    normalized_features = normalize(content_features_matrix)
+    neighbors = build_neighbor_graph(normalized_features)
+    user_profile_sums = build_user_profiles(interactions, normalized_features)
+    ivf_index = build_ivf_index(normalized_features)
+
+    return {
+        'items': items,
+        'available_cuisines': available_cuisines,
+        'feature_names': list(content_features.columns),
+        'content_features_matrix': content_features_matrix,
+        'normalized_features': normalized_features,
+        'neighbor_indptr': neighbors.indptr,
+        'neighbor_indices': neighbors.indices,
+        'neighbor_sims': neighbors.data,
+        'location_cluster': items['location_cluster'].to_numpy(),
+        'active': np.ones(len(items), dtype=bool),
+        'open_hours': open_hours,
+        'cuisine_columns': cuisine_columns,
+        'cuisine_vocabulary': cuisine_vocabulary,
+        'cuisine_indptr': cuisine_indptr,
+        'cuisine_postings': cuisine_postings,
+        'category_columns': category_columns,
+        'numeric_columns': numeric_columns,
+        'numeric_observed_min': scaler2.data_min_.copy(),
+        'numeric_observed_max': scaler2.data_max_.copy(),
+        'spatial_index': SpatialIndex(items['rest_latitude'], items['rest_longitude']),
+        'core_points': location_scaled[db.core_sample_indices_],
+        'core_labels': db.labels_[db.core_sample_indices_],
+        'scaler': scaler,
+        'mlb': mlb,
+        'encoder': encoder,
+        'scaler2': scaler2,
+        'user_profile_sums': user_profile_sums,
+        **ivf_index,
+        **interactions,
+        **user_locations,
+        **shards,
+    }
+
+
+@contextlib.contextmanager
+def build_lock(bundle_dir):
+    """Exclusive lock on `bundle_dir` across processes, held while a build is written."""
+    os.makedirs(bundle_dir, exist_ok=True)
+    with open(os.path.join(bundle_dir, ".build.lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def save_bundle(model, bundle_dir, fingerprint):
+    """
+    Write a built model as a new build directory under `bundle_dir` and switch
+    the bundle to it. Large arrays go to .npy files, everything else to a single
+    joblib file. Files of a build are never rewritten, since other processes may
+    have them memory-mapped; the top-level manifest naming the current build is
+    replaced atomically once the build is complete. Callers writing to a shared
+    `bundle_dir` hold its build_lock.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    previous = read_manifest(bundle_dir)
+    build = f"{fingerprint[:16]}-v{BUNDLE_VERSION}-{time.time_ns():x}"
+    build_dir = os.path.join(bundle_dir, build)
+    os.makedirs(build_dir)
+    for name in ARRAY_ARTIFACTS:
+        np.save(os.path.join(build_dir, f"{name}.npy"), np.ascontiguousarray(model[name]))
+
+    artifacts = {k: v for k, v in model.items() if k not in ARRAY_ARTIFACTS + RUNTIME_ARTIFACTS}
+    joblib.dump(artifacts, os.path.join(build_dir, "artifacts.joblib"))
+
+    manifest = {"version": BUNDLE_VERSION, "fingerprint": fingerprint, "build": build}
+    tmp_path = os.path.join(bundle_dir, f"manifest.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(bundle_dir, "manifest.json"))
+
+    # Older builds are removed, except the one just replaced, which a process may be
+    # about to open. Removing files keeps existing memory maps of them valid.
+    keep = {build, (previous or {}).get("build")}
+    for entry in os.listdir(bundle_dir):
+        path = os.path.join(bundle_dir, entry)
+        if entry not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def read_manifest(bundle_dir):
+    """The bundle's manifest, or None if there is no complete build in the current layout."""
+    try:
+        with open(os.path.join(bundle_dir, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if "build" in manifest else None
+
+
+def is_current(manifest, fingerprint):
+    return manifest is not None and (manifest["version"], manifest["fingerprint"]) == (BUNDLE_VERSION, fingerprint)
+
+
+def load_bundle(bundle_dir, mmap=True):
+    """Load the current build of a bundle; arrays are memory-mapped read-only unless `mmap` is False."""
+    manifest = read_manifest(bundle_dir)
+    build_dir = os.path.join(bundle_dir, manifest["build"])
+    model = joblib.load(os.path.join(build_dir, "artifacts.joblib"))
+    for name in ARRAY_ARTIFACTS:
+        model[name] = np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode='r' if mmap else None)
+    model['fingerprint'] = manifest['fingerprint']
+    return prepare_model(model)
+
+
+def prepare_model(model, user_profiles=None):
+    """
+    Derive the runtime structures of a model (CSR neighbour graph, profile cache)
+    and mark its arrays read-only. Passing the `user_profiles` cache of the model
+    this one replaces carries its pending ratings over.
+    """
+    model['neighbors'] = csr_matrix(
+        (model['neighbor_sims'], model['neighbor_indices'], model['neighbor_indptr']),
+        shape=(len(model['normalized_features']),) * 2
+    )
+    model['cuisine_index'] = cuisines.CuisineIndex(
+        model['cuisine_vocabulary'], model['cuisine_indptr'], model['cuisine_postings']
+    )
+    # Catalogue positions from most to least popular, for the popular-in-cuisine candidates
+    model['popular_order'] = np.argsort(-model['items']['popularity_score_scaled'].to_numpy(), kind='stable')
+
+    # The model is shared by every request thread, so it is never written to;
+    # the profile cache keeps its own overlay for ratings that arrive later
+    for name in ARRAY_ARTIFACTS:
+        model[name].setflags(write=False)
+    cache_args = (
+        model['user_ids'], model['user_profile_sums'], model['normalized_features'],
+        model['items']['placeID'].to_numpy()
+    )
+    model['user_profiles'] = (
+        user_profiles.rebase(*cache_args) if user_profiles is not None else UserProfileCache(*cache_args)
+    )
+    return model
+
+
+def replace_model(model):
+    """Swap in an updated model; requests already running keep the one they started with."""
+    global _model
+    with _model_lock:
+        _model = model
+
+
+def update_user_profile(user_id, place_id, rating, previous_rating=None):
+    """Fold a newly arrived rating or review into the cached profile of `user_id`."""
+    load_model()['user_profiles'].add_rating(user_id, place_id, rating, previous_rating)
+
+
+def similarity_row(model, idx):
+    """Cosine similarity of item `idx` to every item, scored on the fly."""
+    features = model['normalized_features']
+    return features @ features[idx]
+
+
+def get_user_location(model, user_id):
+    """The (latitude, longitude) home location of `user_id`, or None if unknown."""
+    user_ids = model['user_ids']
+    u = np.searchsorted(user_ids, str(user_id))
+    if u == len(user_ids) or user_ids[u] != str(user_id):
+        return None
+    latitude, longitude = model['user_latitudes'][u], model['user_longitudes'][u]
+    if np.isnan(latitude) or np.isnan(longitude):
+        return None
+    return float(latitude), float(longitude)
+
+
+def distance_mask(model, location, max_distance, positions=None):
+    """
+    Catalogue mask of places within `max_distance` km of `location`. Only places
+    inside the radius are measured; without a location the precomputed
+    `distance_km` column is used. With `positions`, the mask covers just those
+    catalogue positions, each measured directly.
+    """
+    if location is None:
+        distances = model['items']['distance_km'].to_numpy()
+        return (distances if positions is None else distances[positions]) <= max_distance
+    if positions is not None:
+        items = model['items']
+        latitudes = items['rest_latitude'].to_numpy()[positions]
+        longitudes = items['rest_longitude'].to_numpy()[positions]
+        return haversine_km(location[0], location[1], latitudes, longitudes) <= max_distance
+    mask = np.zeros(len(model['items']), dtype=bool)
+    positions, _ = model['spatial_index'].query_radius(location[0], location[1], max_distance)
+    mask[positions] = True
+    return mask
+
+
+def assign_location_cluster(model, latitude, longitude):
+    """
+    DBSCAN cluster for a new location without refitting: the cluster of the
+    nearest core point if it lies within eps, otherwise noise (-1).
+    """
+    if pd.isna(latitude) or pd.isna(longitude) or not len(model['core_points']):
+        return -1
+    point = model['scaler'].transform(pd.DataFrame([[latitude, longitude]], columns=['rest_latitude', 'rest_longitude']))
+    distances = np.linalg.norm(model['core_points'] - point, axis=1)
+    nearest = np.argmin(distances)
+    return int(model['core_labels'][nearest]) if distances[nearest] <= DBSCAN_EPS else -1
+
+
+def shard_slices(model, location, radius_km):
+    """
+    (start, end) catalogue slices of the location shards whose bounding box
+    comes within `radius_km` of `location`.
+    """
+    bounds = model['shard_bounds']
+    latitude, longitude = location
+    nearest_latitude = np.clip(latitude, bounds[:, 0], bounds[:, 1])
+    nearest_longitude = np.clip(longitude, bounds[:, 2], bounds[:, 3])
+    hit = np.flatnonzero(haversine_km(latitude, longitude, nearest_latitude, nearest_longitude) <= radius_km)
+    indptr = model['shard_indptr']
+    slices = [(indptr[s], indptr[s + 1]) for s in hit]
+
+    # Restaurants added incrementally sit after the last shard and are always scored
+    if indptr[-1] < len(model['items']):
+        slices.append((indptr[-1], len(model['items'])))
+    return slices
+
+
+def get_user_history(model, user_id):
+    """Item positions and ratings of everything `user_id` rated, or None for an unknown user."""
+    user_ids = model['user_ids']
+    u = np.searchsorted(user_ids, str(user_id))
+    if u == len(user_ids) or user_ids[u] != str(user_id):
+        return None
+    start, end = model['user_indptr'][u], model['user_indptr'][u + 1]
+    return model['interaction_items'][start:end], model['interaction_ratings'][start:end]
+
+
+def get_neighbors(model, idx):
+    """The precomputed top-k neighbours of item `idx` as (indices, similarities), skipping removed items."""
+    neighbors = model['neighbors']
+    start, end = neighbors.indptr[idx], neighbors.indptr[idx + 1]
+    indices, sims = neighbors.indices[start:end], neighbors.data[start:end]
+    active = model['active'][indices]
+    return indices[active], sims[active]
+
+
+def build_bundle(data_path=DATA_PATH, bundle_dir=BUNDLE_DIR, force=False, user_profile_path=USER_PROFILE_PATH):
+    """
+    Build and save the model bundle for `data_path` (and the user locations in
+    `user_profile_path`, if present) unless an up-to-date one already exists.
+    Returns the source fingerprint. Builds are serialized across processes, so
+    processes that find the bundle stale at the same time build it only once.
+    """
+    fingerprint = fingerprint_sources(data_path, user_profile_path)
+    if not force and is_current(read_manifest(bundle_dir), fingerprint):
+        return fingerprint
+    with build_lock(bundle_dir):
+        # Another process may have built it while this one waited for the lock
+        if force or not is_current(read_manifest(bundle_dir), fingerprint):
+            data = data_loader.load_processed(data_path, model_columns)
+            user_profiles = pd.read_csv(user_profile_path) if os.path.exists(user_profile_path) else None
+            save_bundle(build_model(data, user_profiles), bundle_dir, fingerprint)
+    return fingerprint
+
+
+def load_model(data_path=DATA_PATH, bundle_dir=BUNDLE_DIR, user_profile_path=USER_PROFILE_PATH):
+    """
+    Return the loaded recommender model, building the bundle first if the source
+    CSV changed since it was written. If the CSV is absent, a prebuilt bundle is
+    served as-is. The model is loaded once per process.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if os.path.exists(data_path) or read_manifest(bundle_dir) is None:
+                    build_bundle(data_path, bundle_dir, user_profile_path=user_profile_path)
+                _model = load_bundle(bundle_dir)
+    return _model
+
+
+def __getattr__(name):
+    # Keep the old module-level names working, loading the model on first access.
+    # `data` is now the unique-restaurant catalogue.
+    if name == 'data':
+        return load_model()['items']
+    if name in ('items', 'available_cuisines', 'content_features_matrix', 'normalized_features',
+                'neighbors', 'scaler', 'mlb', 'encoder', 'scaler2'):
+        return load_model()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Soft-filter bonuses added to the similarity score
+CUISINE_BONUS = 0.1
+DISTANCE_BONUS = 0.1
+DISTANCE_PENALTY = 0.05
+GROUP_BONUS = 0.1
+DAY_BONUS = 0.1
+
+RESULT_COLUMNS = [
+    'placeID', 'name', 'Rcuisine_x', 'distance_km', 'group_friendly_score',
+    'matching_score', 'avg_rating', 'rest_latitude', 'rest_longitude'
+]
+
+
+def score_items(model, sim, cuisine=None, max_distance=10, min_group_score=0.5, days=None, rows=None,
+                within_distance=None):
+    """
+    Add the cuisine, distance, group-friendliness and day-availability bonuses to
+    the similarity scores `sim` (one per catalogue item, or one row of those per
+    user), all as column-wise array operations. When `rows` is given, `sim` only
+    covers those catalogue positions and only they are scored. `within_distance`
+    is a mask from distance_mask (or one per user) over the same positions as
+    `sim`; by default the precomputed `distance_km` column decides the distance bonus.
+    """
+    items = model['items']
+    positions = rows
+    rows = slice(None) if rows is None else rows
+    score = np.array(sim, dtype=np.float64)
+
+    # cuisine preference, looked up in the cuisine posting lists
+    if cuisine and cuisine in model['cuisine_index']:
+        served = model['cuisine_index'].serves(cuisine, len(items), positions)
+        score += np.where(served, CUISINE_BONUS, 0.0)
+
+    # distance
+    if within_distance is None:
+        within_distance = distance_mask(model, None, max_distance)[rows]
+    score += np.where(within_distance, DISTANCE_BONUS, -DISTANCE_PENALTY)
+
+    # group friendliness
+    score += np.where(items['group_friendly_score'].to_numpy()[rows] >= min_group_score, GROUP_BONUS, 0.0)
+
+    # day availability bonus if open on any selected day
+    if days:
+        open_any = schedule.is_open(model['open_hours'][rows], schedule.query_mask(days))
+        score += np.where(open_any, DAY_BONUS, 0.0)
+
+    # removed restaurants are never recommended
+    return np.where(model['active'][rows], score, -np.inf)
+
+
+def top_k_indices(scores, k):
+    """
+    Positions of the `k` highest scores along the last axis, best first; ties keep
+    their original order.
+    """
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    top_scores = np.take_along_axis(scores, top, axis=-1)
+    return np.take_along_axis(top, np.lexsort((top, -top_scores)), axis=-1)
+
+
+def neighbor_candidates(model, request, budget):
+    """
+    Places the user rated and their precomputed neighbours, most similar first.
+    Users without a rating history get the places nearest to their profile in
+    the closest inverted lists instead.
+    """
+    history = get_user_history(model, request['user_id'])
+    if history is None or not len(history[0]):
+        candidates = ann_candidates(model, request['profile'])
+        sims = model['normalized_features'][candidates] @ request['profile']
+        return candidates[top_k_indices(sims, budget)]
+
+    rated = history[0]
+    neighbors = model['neighbors'][rated]
+    indices = np.concatenate([rated, neighbors.indices])
+    sims = np.concatenate([np.ones(len(rated)), neighbors.data])
+    indices = indices[np.argsort(-sims, kind='stable')]
+    _, first = np.unique(indices, return_index=True)
+    return indices[np.sort(first)][:budget]
+
+
+def nearby_candidates(model, request, budget):
+    """The places nearest to the request location that lie within `max_distance`."""
+    location = request['location']
+    if location is None:
+        distances = model['items']['distance_km'].to_numpy()
+        nearest = top_k_indices(-distances, budget)
+        return nearest[distances[nearest] <= request['max_distance']]
+    positions, distances = model['spatial_index'].query_nearest(location[0], location[1], budget)
+    return positions[distances <= request['max_distance']]
+
+
+def popular_candidates(model, request, budget):
+    """The most popular places serving the requested cuisine (any cuisine when none is given)."""
+    cuisine = request['cuisine']
+    if not cuisine or cuisine not in model['cuisine_index']:
+        return model['popular_order'][:budget]
+    serving = model['cuisine_index'].rows(cuisine)
+    return serving[top_k_indices(model['items']['popularity_score_scaled'].to_numpy()[serving], budget)]
+
+
+# Candidate generators of the two-stage search, each called as
+# generator(model, request, budget) and returning up to `budget` catalogue positions
+CANDIDATE_GENERATORS = {
+    'neighbors': neighbor_candidates,
+    'nearby': nearby_candidates,
+    'popular': popular_candidates,
+}
+
+
+def generate_candidates(model, request, budget=CANDIDATE_BUDGET, generators=None, timings=None):
+    """
+    Union of the positions proposed by each generator, which share `budget`
+    evenly; removed places are dropped. Each generator's time in ms is recorded
+    in `timings` under its name.
+    """
+    generators = CANDIDATE_GENERATORS if generators is None else generators
+    timings = {} if timings is None else timings
+    share = max(budget // max(len(generators), 1), 1)
+    found = []
+    for name, generator in generators.items():
+        start = time.perf_counter()
+        found.append(np.asarray(generator(model, request, share), dtype=np.intp))
+        timings[name] = (time.perf_counter() - start) * 1000
+    candidates = np.unique(np.concatenate(found + [np.zeros(0, dtype=np.intp)]))
+    return candidates[model['active'][candidates]]
+
+
+def recommend(model, user_id, cuisine=None, max_distance=10, min_group_score=0.5, days=None, top_n=10,
+              search='exact', n_probe=ANN_N_PROBE, location=None, prune_shards=False,
+              candidate_budget=CANDIDATE_BUDGET, generators=None):
+    """
+    Score `model` for one user and return a freshly allocated result frame.
+    The model is only read, so this is safe to call from many threads at once.
+
+    With search='ann' only the items in the `n_probe` inverted lists nearest to
+    the user's profile are scored; raising `n_probe` trades latency for recall.
+    Distances are measured from `location` (latitude, longitude), defaulting to
+    the user's home location from userprofile.csv. With `prune_shards`, only the
+    location shards that intersect the `max_distance` radius are scored, so
+    places elsewhere are never recommended.
+
+    With search='two_stage', the `generators` (default CANDIDATE_GENERATORS)
+    propose about `candidate_budget` places and only those are re-ranked, so
+    the cost of a request is bounded by the budget rather than the catalogue.
+    The time in ms spent in each stage is returned in the frame's
+    attrs['timings'].
+    """
+    items = model['items']
+
+    profile = model['user_profiles'].vector(user_id)
+    if profile is None:
+        return pd.DataFrame({'error': [f"User ID {user_id} not found."]})
+    if search not in ('exact', 'ann', 'two_stage'):
+        raise ValueError(f"Unknown search mode {search!r}; expected 'exact', 'ann' or 'two_stage'.")
+    if location is None:
+        location = get_user_location(model, user_id)
+    timings = {}
+
+    # Candidate places: the whole catalogue unless narrowed to nearby shards,
+    # the nearest inverted lists and/or the two-stage candidate generators
+    candidates, slices = None, None
+    if prune_shards and location is not None:
+        slices = shard_slices(model, location, max_distance)
+        candidates = np.concatenate([np.arange(start, end) for start, end in slices] + [np.zeros(0, dtype=np.intp)])
+    if search == 'ann':
+        nearest_lists = ann_candidates(model, profile, n_probe)
+        candidates = nearest_lists if candidates is None else np.intersect1d(candidates, nearest_lists)
+    if search == 'two_stage':
+        request = {'user_id': user_id, 'profile': profile, 'location': location,
+                   'cuisine': cuisine, 'max_distance': max_distance}
+        generated = generate_candidates(model, request, candidate_budget, generators, timings)
+        candidates = generated if candidates is None else np.intersect1d(candidates, generated)
+
+    # Similarity of every candidate place to everything the user has rated
+    stage_start = time.perf_counter()
+    features = model['normalized_features']
+    if candidates is None:
+        sim = features @ profile
+    elif search == 'exact':
+        # Shards are contiguous, so each one is scored straight from its slice
+        sim = np.concatenate([features[start:end] @ profile for start, end in slices] + [np.zeros(0)])
+    else:
+        sim = features[candidates] @ profile
+    timings['similarity'] = (time.perf_counter() - stage_start) * 1000
+
+    # Re-rank: soft-filter bonuses for the scored places only
+    stage_start = time.perf_counter()
+    if search == 'two_stage':
+        within_distance = distance_mask(model, location, max_distance, positions=candidates)
+    else:
+        within_distance = distance_mask(model, location, max_distance)
+        within_distance = within_distance if candidates is None else within_distance[candidates]
+    scores = score_items(model, sim, cuisine, max_distance, min_group_score, days, rows=candidates,
+                         within_distance=within_distance)
+    top = top_k_indices(scores, top_n)
+    top = top[np.isfinite(scores[top])]
+    positions = top if candidates is None else candidates[top]
+    timings['rerank'] = (time.perf_counter() - stage_start) * 1000
+
+    top_recs = items.iloc[positions].assign(matching_score=scores[top])
+    if location is not None:
+        top_recs['distance_km'] = haversine_km(
+            location[0], location[1], top_recs['rest_latitude'], top_recs['rest_longitude']
+        )
+    top_recs = top_recs[RESULT_COLUMNS]
+    top_recs.attrs['timings'] = timings
+    return top_recs
+
+
+def ann_recall_report(user_ids=None, top_n=10, n_probes=(1, 2, 4, 8, 16), **filters):
+    """
+    Recall@top_n of the approximate search against the exact path for each
+    `n_probe`, with mean per-request latency of both, over `user_ids` (default:
+    every user in the bundle).
+    """
+    model = load_model()
+    user_ids = list(model['user_ids']) if user_ids is None else list(user_ids)
+
+    def timed(**kwargs):
+        results, start = {}, time.perf_counter()
+        for user_id in user_ids:
+            results[user_id] = set(recommend(model, user_id, top_n=top_n, **filters, **kwargs)['placeID'])
+        return results, (time.perf_counter() - start) * 1000 / max(len(user_ids), 1)
+
+    exact, exact_ms = timed(search='exact')
+    rows = []
+    for n_probe in n_probes:
+        approx, ann_ms = timed(search='ann', n_probe=n_probe)
+        recall = np.mean([len(approx[u] & exact[u]) / max(len(exact[u]), 1) for u in user_ids])
+        rows.append({'n_probe': n_probe, 'recall': recall, 'ann_ms': ann_ms, 'exact_ms': exact_ms})
+    return pd.DataFrame(rows)
+
 
 def get_soft_filtered_recommendations(
     user_id,
@@ -61,49 +928,111 @@ def get_soft_filtered_recommendations(
     max_distance=10,
     min_group_score=0.5,
     days=None,           # <-- now a list of day codes, e.g. ['mon','fri']
-    top_n=10
+    top_n=10,
+    search='exact',      # 'ann' scores only the nearest inverted lists, 'two_stage' only generated candidates
+    n_probe=ANN_N_PROBE,
+    location=None,       # (latitude, longitude); defaults to the user's home
+    prune_shards=False,  # score only location shards within max_distance
+    candidate_budget=CANDIDATE_BUDGET  # places re-ranked by search='two_stage'
 ):
     """
     Personalized recommendations for a user with optional cuisine, distance,
     group friendliness, and a list of days when they want to visit.
     """
-    if user_id not in data['userID'].values:
-        return pd.DataFrame({'error': [f"User ID {user_id} not found."]})
+    return recommend(load_model(), user_id, cuisine, max_distance, min_group_score, days, top_n,
+                     search, n_probe, location, prune_shards, candidate_budget)
+
+
+def _score_batch_chunk(user_ids, filter_args, top_n, model=None):
+    """
+    Score one chunk of users with a single matrix product and return tidy result
+    columns. Users sharing the same filter arguments get their bonuses in one step.
+    """
+    model = model if model is not None else load_model()
+    items = model['items']
+
+    profiles, known = [], []
+    for i, user_id in enumerate(user_ids):
+        profile = model['user_profiles'].vector(user_id)
+        if profile is not None:
+            profiles.append(profile)
+            known.append(i)
+
+    features = model['normalized_features']
+    scores = np.reshape(profiles, (len(known), features.shape[1])) @ features.T
+
+    groups = {}
+    for row, i in enumerate(known):
+        groups.setdefault(repr(filter_args[i]), (filter_args[i], []))[1].append(row)
+    for args, rows in groups.values():
+        within_distance = np.array([
+            distance_mask(model, get_user_location(model, user_ids[known[row]]), args['max_distance'])
+            for row in rows
+        ])
+        scores[rows] = score_items(model, scores[rows], within_distance=within_distance, **args)
+
+    top = top_k_indices(scores, top_n)
+    n_ranked = top.shape[1]
+    top_scores = np.take_along_axis(scores, top, axis=1).ravel()
+    ranked = np.isfinite(top_scores)
+    return {
+        'userID': np.repeat(np.asarray(user_ids, dtype=object)[known], n_ranked)[ranked],
+        'rank': np.tile(np.arange(1, n_ranked + 1), len(known))[ranked],
+        'placeID': items['placeID'].to_numpy()[top].ravel()[ranked],
+        'score': top_scores[ranked],
+    }
+
+
+def get_batch_recommendations(
+    user_ids,
+    cuisine=None,
+    max_distance=10,
+    min_group_score=0.5,
+    days=None,
+    top_n=10,
+    user_filters=None,
+    chunk_size=BATCH_CHUNK_SIZE,
+    n_jobs=1
+):
+    """
+    Recommendations for many users at once, as a tidy (userID, rank, placeID, score)
+    frame. The filter arguments are shared by every user unless overridden per user
+    through `user_filters` ({user_id: {'cuisine': ..., ...}}). Users are scored
+    `chunk_size` at a time, spread over `n_jobs` processes; unknown users are skipped.
+    """
+    user_ids = list(user_ids)
+    shared = {'cuisine': cuisine, 'max_distance': max_distance,
+              'min_group_score': min_group_score, 'days': days}
+    user_filters = user_filters or {}
+    filter_args = [{**shared, **user_filters.get(user_id, {})} for user_id in user_ids]
+
+    chunks = [
+        (user_ids[start:start + chunk_size], filter_args[start:start + chunk_size], top_n)
+        for start in range(0, len(user_ids), chunk_size)
+    ]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_score_batch_chunk, *zip(*chunks)))
+    else:
+        model = load_model()
+        results = [_score_batch_chunk(*chunk, model=model) for chunk in chunks]
+
+    columns = ['userID', 'rank', 'placeID', 'score']
+    if not results:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame({c: np.concatenate([r[c] for r in results]) for c in columns})
+
+
+__all__ = [
+    'get_soft_filtered_recommendations', 'get_batch_recommendations', 'recommend',
+    'update_user_profile', 'ann_recall_report', 'available_cuisines', 'load_model', 'build_bundle'
+]
+
 
-    # Base similarity on the user's top-rated place
-    user_history = data[data['userID'] == user_id]
-    top_place_id = user_history.sort_values('rating', ascending=False).iloc[0]['placeID']
-    idx = data[data['placeID'] == top_place_id].index[0]
-    sim_scores = list(enumerate(cosine_sim_matrix[idx]))
-
-    def calculate_score(row):
-        score = sim_scores[row.name][1]
-        # cuisine preference
-        if cuisine and cuisine.lower() in row['combined_cuisine']:
-            score += 0.1
-        # distance
-        if row['distance_km'] <= max_distance:
-            score += 0.1
-        else:
-            score -= 0.05
-        # group friendliness
-        if row['group_friendly_score'] >= min_group_score:
-            score += 0.1
-        # day availability bonus if any selected day matches
-        if days:
-            for d in days:
-                col = f"days_{d.capitalize()}"
-                if col in row and row[col] == 1:
-                    score += 0.1
-                    break
-        return score
-
-    data['matching_score'] = data.apply(calculate_score, axis=1)
-    top_recs = data.sort_values('matching_score', ascending=False).head(top_n)
-
-    return top_recs[[
-        'placeID','name','Rcuisine_x','distance_km','group_friendly_score',
-        'matching_score','avg_rating','rest_latitude','rest_longitude'
-    ]]
-
-__all__ = ['get_soft_filtered_recommendations', 'available_cuisines']
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the prebuilt recommender model bundle.")
+    parser.add_argument("--data", default=DATA_PATH, help="processed data CSV")
+    parser.add_argument("--bundle", default=BUNDLE_DIR, help="output bundle directory")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the fingerprint matches")
+    args = parser.parse_args()
+    print(f"Bundle fingerprint: {build_bundle(args.data, args.bundle, args.force)}")
@@ -0,0 +1,146 @@
+"""
+Weekly open-hours schedules compiled to bitmasks.
+
+A schedule is 7 uint32 words, Monday to Sunday, where bit h of a day's word
+means the restaurant is open at some point during hour h (168 bits a week),
+and the DAY_FLAG bit above the hours means the day is one of its `days_*`
+flags. Day-only queries test the flags; time queries test the hours, which
+include ranges running past midnight from the day before.
+Each restaurant's `hours` string and `days_*` flags are compiled once; a
+day, time-slot or "open now" query is then a mask of the same shape and a
+single bitwise AND across the catalogue.
+"""
+import numpy as np
+import pandas as pd
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+HOURS_PER_DAY = 24
+DAY_FLAG = 1 << HOURS_PER_DAY
+DAY_PREFIX = 'days_'
+
+
+def day_index(day):
+    """Index (Monday is 0) of a day given as an index or a name like 'mon' or 'Friday', or None."""
+    if isinstance(day, (int, np.integer)):
+        return int(day) if 0 <= day < len(DAYS) else None
+    name = str(day).strip()[:3].lower()
+    return DAYS.index(name) if name in DAYS else None
+
+
+def column_days(column):
+    """Days covered by a day-flag column, e.g. 'days_Mon;Tue;Wed;Thu;Fri;' -> [0, 1, 2, 3, 4]."""
+    days = (day_index(name) for name in column[len(DAY_PREFIX):].split(';') if name.strip())
+    return [d for d in days if d is not None]
+
+
+def hour_bits(start, end):
+    """Bits of the hours in [start, end), clipped to one day."""
+    start, end = max(start, 0), min(end, HOURS_PER_DAY)
+    return ((1 << end) - 1) ^ ((1 << start) - 1) if end > start else 0
+
+
+def parse_hours(hours):
+    """
+    (same_day, next_day) hour bits of an hours string like
+    '09:00-13:00;16:00-20:00;'. A range that closes at or before its opening
+    time runs past midnight into the next day; a partly open hour counts as
+    open. None when the string is missing or has no valid range.
+    """
+    if pd.isna(hours):
+        return None
+    same_day, next_day, parsed = 0, 0, False
+    for part in str(hours).split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            open_time, close_time = part.split('-')
+            open_hour, open_minute = (int(v) for v in open_time.split(':'))
+            close_hour, close_minute = (int(v) for v in close_time.split(':'))
+        except ValueError:
+            continue
+        end = close_hour + (close_minute > 0)
+        if (close_hour, close_minute) <= (open_hour, open_minute):
+            end += HOURS_PER_DAY
+        same_day |= hour_bits(open_hour, end)
+        next_day |= hour_bits(0, end - HOURS_PER_DAY)
+        parsed = True
+    return (same_day, next_day) if parsed else None
+
+
+def _row_hours(frame):
+    """(same_day, next_day) hour bits of every row; rows with missing hours have none."""
+    # Each distinct hours string is parsed once; code -1 (missing) picks the trailing default
+    hours = frame['hours'] if 'hours' in frame.columns else pd.Series(np.nan, index=frame.index)
+    codes, uniques = pd.factorize(hours)
+    parsed = [parse_hours(h) for h in uniques] + [None]
+    same_day = np.array([p[0] if p else 0 for p in parsed], dtype=np.uint32)[codes]
+    next_day = np.array([p[1] if p else 0 for p in parsed], dtype=np.uint32)[codes]
+    return same_day, next_day
+
+
+def compile_hours(frame):
+    """
+    (n,) uint32 hour bits of every row, ignoring its `days_*` flags: bit h is
+    set when the row's hours cover hour h on some day, so rows without day
+    flags still answer time-of-day queries.
+    """
+    same_day, next_day = _row_hours(frame)
+    return same_day | next_day
+
+
+def compile_rows(frame):
+    """
+    (n, 7) uint32 schedule of every row of a frame with an `hours` column and
+    `days_*` flags. A row is open during its hours on each flagged day; rows
+    whose hours are missing still carry their day flags but match no time.
+    """
+    day_flags = np.zeros((len(frame), len(DAYS)), dtype=bool)
+    for column in frame.columns:
+        if column.startswith(DAY_PREFIX):
+            flagged = frame[column].fillna(0).to_numpy() == 1
+            day_flags[:, column_days(column)] |= flagged[:, None]
+
+    same_day, next_day = _row_hours(frame)
+    schedules = np.where(day_flags, same_day[:, None], 0).astype(np.uint32)
+    schedules |= np.roll(np.where(day_flags, next_day[:, None], 0).astype(np.uint32), 1, axis=1)
+    schedules |= np.where(day_flags, DAY_FLAG, 0).astype(np.uint32)
+    return schedules
+
+
+def compile_schedules(frame, place_ids, key='placeID'):
+    """
+    Schedule of each of `place_ids`, combining every row of `frame` for that
+    place (the processed data repeats a place once per hours entry and rating).
+    Places without rows are never open.
+    """
+    row_schedules = compile_rows(frame)
+    positions = pd.Index(place_ids).get_indexer(frame[key])
+    found = positions >= 0
+    schedules = np.zeros((len(place_ids), len(DAYS)), dtype=np.uint32)
+    np.bitwise_or.at(schedules, positions[found], row_schedules[found])
+    return schedules
+
+
+def query_mask(days=None, hours=None):
+    """
+    Query for places open during `hours` ((start, end) in whole hours, end up
+    to 24) on any of `days`. Without hours it matches the days the places are
+    flagged as open. None means every day; unknown day names are ignored.
+    """
+    indices = range(len(DAYS)) if days is None else [d for d in map(day_index, days) if d is not None]
+    mask = np.zeros(len(DAYS), dtype=np.uint32)
+    mask[list(indices)] = DAY_FLAG if hours is None else hour_bits(*hours)
+    return mask
+
+
+def at_time(when):
+    """Query for places open at the datetime `when` ("open now")."""
+    mask = np.zeros(len(DAYS), dtype=np.uint32)
+    mask[when.weekday()] = 1 << when.hour
+    return mask
+
+
+def is_open(schedules, query):
+    """Which of `schedules` match `query`, as one bitwise AND across them."""
+    return (schedules & query).any(axis=-1)
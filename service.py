@@ -0,0 +1,299 @@
+"""
+Headless HTTP/JSON recommendation service.
+
+Serves the recommender's scoring and the app's sidebar filtering without
+Streamlit, so other clients can use them and they can be scaled apart from the
+UI. An asyncio server speaks HTTP/1.1 with keep-alive and hands the CPU-bound
+work to a bounded process pool. The model bundle is built or loaded before the
+pool starts; each worker then holds the (memory-mapped) bundle and the filter
+index once and reuses them. Requests beyond the pool and
+its queue are turned away with 503 so a load balancer can retry elsewhere.
+
+    python service.py --port 8502 --workers 4
+    python service.py --port 8502 --reuse-port   # several instances on one port
+
+Endpoints (JSON bodies):
+    GET  /healthz    liveness, pool size and requests in flight
+    POST /recommend  recommender.recommend for {"user_id": ..., filters...}
+    POST /filter     the app's filters: {"cuisine", "max_distance", "min_group_score",
+                     "min_rating", "days", "hours", "top_n", "location"}
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import recommender
+from data_loader import load_processed, datasets
+from filter_index import RESTAURANT_COLUMNS, RestaurantFilter
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+# Requests allowed to wait for a busy worker before new ones get 503
+MAX_PENDING = 64
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = 15.0
+MAX_BODY_BYTES = 1 << 20
+
+RESTAURANT_DATA_PATH = os.path.join('data', 'processed_data.csv')
+# The restaurant columns /filter returns
+FILTER_RESULT_COLUMNS = [
+    'placeID', 'name', 'Rcuisine_x', 'avg_rating', 'group_friendly_score', 'distance_km',
+    'rest_latitude', 'rest_longitude'
+]
+
+RECOMMEND_FIELDS = {'user_id', 'cuisine', 'max_distance', 'min_group_score', 'days', 'top_n',
+                    'search', 'n_probe', 'location', 'prune_shards', 'candidate_budget'}
+FILTER_FIELDS = {'cuisine', 'max_distance', 'min_group_score', 'min_rating', 'days', 'hours',
+                 'top_n', 'location'}
+
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                  411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+                  503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """A client error, answered with `status` and the message."""
+
+    def __init__(self, message, status=400):
+        # Both go into args so the error survives the trip back from a worker process
+        super().__init__(message, status)
+        self.message = message
+        self.status = status
+
+    def __str__(self):
+        return self.message
+
+
+def to_records(frame):
+    """JSON-ready rows of a frame, with missing values as None."""
+    # float32 columns go out at their own precision (25.04 rather than 25.0400009155)
+    float32 = frame.select_dtypes('float32').columns
+    frame = frame.assign(**{column: frame[column].astype(str).astype('float64') for column in float32})
+    return json.loads(frame.to_json(orient='records', double_precision=15))
+
+
+def check_fields(request, allowed):
+    if not isinstance(request, dict):
+        raise RequestError("Request body must be a JSON object.")
+    unknown = sorted(set(request) - allowed)
+    if unknown:
+        raise RequestError(f"Unknown fields: {', '.join(unknown)}")
+
+
+# Worker side: everything below runs in the pool's processes
+
+_restaurant_state = {}
+
+
+def restaurant_state(data_path):
+    """The restaurant filter (as in app2.py), rebuilt when the data changes."""
+    datasets.register('restaurants', data_path, lambda path: load_processed(path, RESTAURANT_COLUMNS))
+    version = datasets.version('restaurants')
+    if _restaurant_state.get('version') != version:
+        _restaurant_state.update(version=version, filter=RestaurantFilter(datasets.get('restaurants')))
+    return _restaurant_state
+
+
+def check_pair(request, name):
+    """The field `name` as a (number, number) tuple, or None when it is absent."""
+    value = request.get(name)
+    if value is None:
+        return None
+    if (not isinstance(value, list) or len(value) != 2
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)):
+        raise RequestError(f"{name} must be a list of two numbers.")
+    return tuple(value)
+
+
+def run_filter(request, data_path=RESTAURANT_DATA_PATH):
+    """The app's sidebar filtering: best-rated rows first, distances from `location` when given."""
+    check_fields(request, FILTER_FIELDS)
+    location, hours = check_pair(request, 'location'), check_pair(request, 'hours')
+    top_n = request.get('top_n', 10)
+    if not isinstance(top_n, int) or isinstance(top_n, bool):
+        raise RequestError("top_n must be an integer.")
+    state = restaurant_state(data_path)
+    max_distance = request.get('max_distance', 10)
+
+    try:
+        result = state['filter'].select(
+            top_n, location=location, max_distance=max_distance, cuisine=request.get('cuisine'),
+            min_group_score=request.get('min_group_score'), min_rating=request.get('min_rating'),
+            days=request.get('days'), hours=hours
+        )
+    except (TypeError, ValueError) as error:
+        raise RequestError(str(error))
+    return {'results': to_records(result[FILTER_RESULT_COLUMNS])}
+
+
+def run_recommend(request):
+    """recommender.recommend for one user, with its stage timings."""
+    check_fields(request, RECOMMEND_FIELDS)
+    if 'user_id' not in request:
+        raise RequestError("Missing field: user_id")
+    kwargs = dict(request, location=check_pair(request, 'location'))
+    user_id = kwargs.pop('user_id')
+    try:
+        result = recommender.recommend(recommender.load_model(), user_id, **kwargs)
+    except (TypeError, ValueError) as error:
+        raise RequestError(str(error))
+    if 'error' in result.columns:
+        raise RequestError(result['error'].iloc[0], status=404)
+    return {'results': to_records(result), 'timings': result.attrs.get('timings', {})}
+
+
+# Server side
+
+class RecommendationService:
+    """Routes requests to the worker pool, refusing work once `workers + max_pending` are in flight."""
+
+    def __init__(self, workers=None, max_pending=MAX_PENDING, data_path=RESTAURANT_DATA_PATH):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.data_path = data_path
+        # Build (or load) the bundle and the restaurant data here, so workers
+        # start from ready files instead of racing to build them on first request
+        recommender.load_model()
+        restaurant_state(data_path)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.in_flight = 0
+        self.started = time.time()
+        self.routes = {
+            '/healthz': ('GET', self.healthz),
+            '/recommend': ('POST', self.recommend),
+            '/filter': ('POST', self.filter),
+        }
+
+    async def healthz(self, request):
+        return {'status': 'ok', 'workers': self.workers, 'in_flight': self.in_flight,
+                'uptime_s': round(time.time() - self.started, 1)}
+
+    async def recommend(self, request):
+        return await self._submit(run_recommend, request)
+
+    async def filter(self, request):
+        return await self._submit(run_filter, request, self.data_path)
+
+    async def _submit(self, func, *args):
+        if self.in_flight >= self.workers + self.max_pending:
+            raise RequestError("Too many requests in flight; retry later.", status=503)
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def dispatch(self, method, path, body):
+        """(status, payload) of one request."""
+        route = self.routes.get(path.split('?', 1)[0])
+        try:
+            if route is None:
+                raise RequestError(f"No such endpoint: {path}", status=404)
+            route_method, handler = route
+            if method != route_method:
+                raise RequestError(f"{path} expects {route_method}", status=405)
+            try:
+                request = json.loads(body) if body else {}
+            except ValueError:
+                raise RequestError("Request body is not valid JSON.")
+            return 200, await handler(request)
+        except RequestError as error:
+            return error.status, {'error': str(error)}
+        except Exception as error:
+            return 500, {'error': f"{type(error).__name__}: {error}"}
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def encode_response(status, payload, keep_alive):
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+    )
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    return (head + "\r\n").encode('latin-1') + body
+
+
+async def handle_connection(service, reader, writer):
+    """Serve requests on one connection until the client closes it, asks to, or idles out."""
+    try:
+        while True:
+            try:
+                request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+            except asyncio.TimeoutError:
+                break
+            if not request_line.strip():
+                break
+            parts = request_line.decode('latin-1').split()
+            if len(parts) != 3:
+                writer.write(encode_response(400, {'error': "Malformed request line."}, False))
+                break
+            method, path, version = parts
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+            if 'transfer-encoding' in headers:
+                writer.write(encode_response(411, {'error': "Send a Content-Length body."}, False))
+                break
+            length = int(headers.get('content-length') or 0)
+            if length > MAX_BODY_BYTES:
+                writer.write(encode_response(413, {'error': "Request body too large."}, False))
+                break
+            body = await reader.readexactly(length) if length else b''
+
+            status, payload = await service.dispatch(method, path, body)
+            writer.write(encode_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_pending=MAX_PENDING,
+                data_path=RESTAURANT_DATA_PATH, reuse_port=False):
+    service = RecommendationService(workers, max_pending, data_path)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port,
+        reuse_port=reuse_port or None
+    )
+    print(f"Serving recommendations on http://{host}:{port} with {service.workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recommendations over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: one per core)")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                        help="requests queued for a busy worker before new ones get 503")
+    parser.add_argument("--data", default=RESTAURANT_DATA_PATH, help="restaurant data for /filter")
+    parser.add_argument("--reuse-port", action="store_true", help="let several instances share the port")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending, args.data, args.reuse_port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+# Mean Earth radius, used to convert between great-circle angles and kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between points given in degrees (broadcasts over arrays)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class SpatialIndex:
+    """
+    Ball tree with the haversine metric over a set of locations. Queries return
+    positions into the arrays the index was built from plus distances in km;
+    locations with a missing coordinate are never returned.
+    """
+
+    def __init__(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._positions = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        points = np.radians(np.column_stack([latitudes[self._positions], longitudes[self._positions]]))
+        self._tree = BallTree(points if len(points) else np.zeros((0, 2)), metric='haversine')
+
+    def __len__(self):
+        return len(self._positions)
+
+    def query_radius(self, latitude, longitude, radius_km, sort=False):
+        """Every location within `radius_km` of the point, nearest first if `sort`."""
+        if not len(self):
+            return np.array([], dtype=np.intp), np.array([])
+        point = np.radians([[latitude, longitude]])
+        found, distances = self._tree.query_radius(
+            point, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=sort
+        )
+        return self._positions[found[0]], distances[0] * EARTH_RADIUS_KM
+
+    def query_nearest(self, latitude, longitude, k):
+        """The `k` locations nearest to the point, nearest first."""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.array([], dtype=np.intp), np.array([])
+        distances, found = self._tree.query(np.radians([[latitude, longitude]]), k=k)
+        return self._positions[found[0]], distances[0] * EARTH_RADIUS_KM
+
+    def distances_within(self, keys, latitude, longitude, radius_km):
+        """Distance (km, to 2 decimals) of every location within `radius_km`, indexed by its entry in `keys`."""
+        positions, distances = self.query_radius(latitude, longitude, radius_km)
+        return pd.Series(distances.round(2), index=np.asarray(keys)[positions])
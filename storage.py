@@ -0,0 +1,585 @@
+"""
+Storage backends for the app's per-user data: bookmarks, reviews, profiles
+and password hashes.
+
+Two interchangeable backends share one interface:
+
+- `JsonBackend` keeps the four `DATA_FILES` JSON documents, each held in
+  memory per process and written through atomically on every change.
+- `SqliteBackend` keeps everything in one SQLite database in WAL mode, with a
+  table per kind of record keyed by user. Each write touches only its own
+  rows, and concurrent writers are serialized by SQLite rather than
+  overwriting each other's documents.
+
+`open_backend` picks one (the `STORAGE_BACKEND` environment variable, SQLite
+by default) and migrates the JSON files into a new database the first time.
+`JournaledBackend` wraps either one so bookmark and review saves return at
+once and reach the backend from a background journal writer.
+"""
+import os
+import copy
+import time
+import json
+import hashlib
+import queue
+import atexit
+import sqlite3
+import threading
+import contextlib
+
+EMPTY_PROFILE = {"full_name": "", "email": "", "phone": "", "address": ""}
+PROFILE_FIELDS = list(EMPTY_PROFILE)
+
+# How long a writer waits for another writer's transaction before failing
+BUSY_TIMEOUT_MS = 5000
+# Most SQLite connections open at once per backend
+SQLITE_POOL_SIZE = 8
+
+# Write-behind journal: at most this many events share one fsync, and the
+# journal is folded into the backend after this many events or once the
+# writer has been idle this long
+JOURNAL_BATCH_SIZE = 256
+COMPACT_EVERY = 1000
+COMPACT_IDLE_SECONDS = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS passwords (
+    username TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    username TEXT PRIMARY KEY,
+    full_name TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    address TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS bookmarks (
+    username TEXT NOT NULL,
+    restaurant TEXT NOT NULL,
+    PRIMARY KEY (username, restaurant)
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    username TEXT NOT NULL,
+    restaurant TEXT NOT NULL,
+    text TEXT NOT NULL,
+    rating REAL,
+    timestamp TEXT,
+    PRIMARY KEY (username, restaurant)
+);
+CREATE INDEX IF NOT EXISTS reviews_by_restaurant ON reviews (restaurant);
+"""
+
+
+def apply_event(event, bookmarks=None, reviews=None):
+    """
+    Apply one journal event to a user's bookmark list or reviews dict in place.
+    Every event sets the state of a single (user, restaurant) key, so applying
+    events that are already reflected again leaves the same result.
+    """
+    op, restaurant = event["op"], event["restaurant"]
+    if op == "add_bookmark" and restaurant not in bookmarks:
+        bookmarks.append(restaurant)
+    elif op == "remove_bookmark" and restaurant in bookmarks:
+        bookmarks.remove(restaurant)
+    elif op == "save_review":
+        reviews[restaurant] = copy.deepcopy(event["review"])
+
+
+def default_hash(user_id):
+    """Initial password hash of a user from userprofile.csv (the user ID itself)."""
+    return hashlib.sha256(user_id.encode()).hexdigest()
+
+
+class JsonStore:
+    # One JSON document held in memory per process. It is re-read only when the
+    # file's mtime changes (another process wrote it), and every change is
+    # written through to disk. Values are copied in and out, so callers never
+    # share the cached document.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._data = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _document(self):
+        # Callers hold the lock
+        mtime = os.stat(self.file_path).st_mtime_ns
+        if self._data is None or mtime != self._mtime:
+            with open(self.file_path, "r") as f:
+                self._data = json.load(f)
+            self._mtime = mtime
+        return self._data
+
+    def items(self):
+        with self._lock:
+            return copy.deepcopy(list(self._document().items()))
+
+    def get(self, key, default=None):
+        with self._lock:
+            return copy.deepcopy(self._document().get(key, default))
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        # Several keys in one rewrite of the document
+        with self._lock:
+            data = self._document()
+            data.update(copy.deepcopy(values))
+            tmp_path = self.file_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.file_path)
+            self._mtime = os.stat(self.file_path).st_mtime_ns
+
+
+class JsonBackend:
+    """The JSON documents of `data_files`, created (and seeded with `default_users`) if missing."""
+
+    def __init__(self, data_files, default_users=()):
+        for file_key, file_path in data_files.items():
+            if not os.path.exists(file_path):
+                initial_data = {}
+
+                # Special handling for default user data
+                if file_key == "PASSWORDS_FILE":
+                    for user_id in default_users:
+                        initial_data[user_id] = default_hash(user_id)
+                elif file_key == "USER_PROFILES_FILE":
+                    for user_id in default_users:
+                        initial_data[user_id] = dict(EMPTY_PROFILE)
+
+                with open(file_path, "w") as f:
+                    json.dump(initial_data, f)
+
+        self.bookmarks_store = JsonStore(data_files["BOOKMARK_FILE"])
+        self.passwords_store = JsonStore(data_files["PASSWORDS_FILE"])
+        self.profiles_store = JsonStore(data_files["USER_PROFILES_FILE"])
+        self.reviews_store = JsonStore(data_files["REVIEWS_FILE"])
+
+    def bookmarks(self, username):
+        return self.bookmarks_store.get(username, [])
+
+    def add_bookmark(self, username, restaurant):
+        bookmarks = self.bookmarks(username)
+        if restaurant not in bookmarks:
+            self.bookmarks_store.set(username, bookmarks + [restaurant])
+
+    def remove_bookmark(self, username, restaurant):
+        bookmarks = self.bookmarks(username)
+        if restaurant in bookmarks:
+            bookmarks.remove(restaurant)
+            self.bookmarks_store.set(username, bookmarks)
+
+    def reviews(self, username):
+        return self.reviews_store.get(username, {})
+
+    def save_review(self, username, restaurant, review):
+        reviews = self.reviews(username)
+        reviews[restaurant] = review
+        self.reviews_store.set(username, reviews)
+
+    def profile(self, username):
+        return self.profiles_store.get(username, dict(EMPTY_PROFILE))
+
+    def save_profile(self, username, profile):
+        self.profiles_store.set(username, profile)
+
+    def password_hash(self, username):
+        return self.passwords_store.get(username, "")
+
+    def set_password_hash(self, username, hashed):
+        self.passwords_store.set(username, hashed)
+
+    def apply_events(self, events):
+        """Apply journal events (see apply_event) with one rewrite of each document they touch."""
+        bookmarks, reviews = {}, {}
+        for event in events:
+            user = event["user"]
+            if event["op"] == "save_review":
+                user_reviews = reviews.get(user)
+                if user_reviews is None:
+                    user_reviews = reviews[user] = self.reviews(user)
+                apply_event(event, reviews=user_reviews)
+            else:
+                user_bookmarks = bookmarks.get(user)
+                if user_bookmarks is None:
+                    user_bookmarks = bookmarks[user] = self.bookmarks(user)
+                apply_event(event, bookmarks=user_bookmarks)
+        if bookmarks:
+            self.bookmarks_store.update(bookmarks)
+        if reviews:
+            self.reviews_store.update(reviews)
+
+
+class SqliteBackend:
+    """
+    The per-user data in a SQLite database at `path`. Calls borrow a
+    connection from a pool of at most `pool_size`, opened on first need and
+    shared by every thread; a call waits when all of them are in use.
+    """
+
+    def __init__(self, path, pool_size=SQLITE_POOL_SIZE):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        self._pool_size = pool_size
+        self._opened = 0
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            opened = self._opened < self._pool_size
+            if opened:
+                self._opened += 1
+        return self._open() if opened else self._pool.get()
+
+    @contextlib.contextmanager
+    def _connection(self):
+        # A pooled connection for one transaction: `with conn` commits on
+        # success and rolls back on error, then the connection goes back
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _query(self, sql, params=()):
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Close the pooled connections; calls made afterwards open new ones."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+    ADD_BOOKMARK = "INSERT OR IGNORE INTO bookmarks (username, restaurant) VALUES (?, ?)"
+    REMOVE_BOOKMARK = "DELETE FROM bookmarks WHERE username = ? AND restaurant = ?"
+    # An upsert keeps the review's rowid, so reviews stay in the order first written
+    SAVE_REVIEW = (
+        "INSERT INTO reviews (username, restaurant, text, rating, timestamp) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (username, restaurant) DO UPDATE SET "
+        "text = excluded.text, rating = excluded.rating, timestamp = excluded.timestamp"
+    )
+
+    def _write(self, sql, params=()):
+        with self._connection() as conn:
+            conn.execute(sql, params)
+
+    def bookmarks(self, username):
+        rows = self._query("SELECT restaurant FROM bookmarks WHERE username = ? ORDER BY rowid", (username,))
+        return [restaurant for (restaurant,) in rows]
+
+    def add_bookmark(self, username, restaurant):
+        self._write(self.ADD_BOOKMARK, (username, restaurant))
+
+    def remove_bookmark(self, username, restaurant):
+        self._write(self.REMOVE_BOOKMARK, (username, restaurant))
+
+    def reviews(self, username):
+        rows = self._query(
+            "SELECT restaurant, text, rating, timestamp FROM reviews WHERE username = ? ORDER BY rowid", (username,)
+        )
+        return {
+            restaurant: {"text": text, "rating": rating, "timestamp": timestamp}
+            for restaurant, text, rating, timestamp in rows
+        }
+
+    def save_review(self, username, restaurant, review):
+        self._write(self.SAVE_REVIEW, self._review_params(username, restaurant, review))
+
+    @staticmethod
+    def _review_params(username, restaurant, review):
+        return (username, restaurant, review.get("text", ""), review.get("rating"), review.get("timestamp"))
+
+    def profile(self, username):
+        rows = self._query(f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles WHERE username = ?", (username,))
+        return dict(zip(PROFILE_FIELDS, rows[0])) if rows else dict(EMPTY_PROFILE)
+
+    def save_profile(self, username, profile):
+        values = [profile.get(field, "") for field in PROFILE_FIELDS]
+        self._write(
+            f"INSERT OR REPLACE INTO profiles (username, {', '.join(PROFILE_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' * len(PROFILE_FIELDS))})",
+            [username] + values,
+        )
+
+    def password_hash(self, username):
+        rows = self._query("SELECT hash FROM passwords WHERE username = ?", (username,))
+        return rows[0][0] if rows else ""
+
+    def set_password_hash(self, username, hashed):
+        self._write("INSERT OR REPLACE INTO passwords (username, hash) VALUES (?, ?)", (username, hashed))
+
+    def apply_events(self, events):
+        """Apply journal events (see apply_event) in a single transaction."""
+        with self._connection() as conn:
+            for event in events:
+                if event["op"] == "save_review":
+                    conn.execute(self.SAVE_REVIEW, self._review_params(event["user"], event["restaurant"], event["review"]))
+                else:
+                    sql = self.ADD_BOOKMARK if event["op"] == "add_bookmark" else self.REMOVE_BOOKMARK
+                    conn.execute(sql, (event["user"], event["restaurant"]))
+
+    def import_records(self, passwords, profiles, bookmarks, reviews):
+        """Bulk-load records in a single transaction, replacing any with the same keys."""
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO passwords (username, hash) VALUES (?, ?)", passwords.items())
+            conn.executemany(
+                f"INSERT OR REPLACE INTO profiles (username, {', '.join(PROFILE_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' * len(PROFILE_FIELDS))})",
+                [[username] + [profile.get(field, "") for field in PROFILE_FIELDS]
+                 for username, profile in profiles.items()],
+            )
+            conn.executemany(
+                self.ADD_BOOKMARK,
+                [(username, restaurant) for username, names in bookmarks.items() for restaurant in names],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO reviews (username, restaurant, text, rating, timestamp) VALUES (?, ?, ?, ?, ?)",
+                [(username, restaurant, review.get("text", ""), review.get("rating"), review.get("timestamp"))
+                 for username, user_reviews in reviews.items() for restaurant, review in user_reviews.items()],
+            )
+
+
+class JournaledBackend:
+    """
+    Write-behind layer over another backend for bookmarks and reviews.
+
+    A save records an event in memory and returns; a background thread appends
+    the events to a line-delimited journal, one fsync per batch, and every so
+    often compacts the journal by applying it to the wrapped backend (the
+    snapshot) and truncating it. Reads return the snapshot with the user's
+    not yet compacted events replayed on top. A journal left behind by a
+    previous process is compacted on startup; events not yet written when a
+    process dies (at most one batch) are lost. Profiles and passwords go
+    straight to the wrapped backend.
+    """
+
+    def __init__(self, backend, journal_path, compact_every=COMPACT_EVERY, idle_seconds=COMPACT_IDLE_SECONDS):
+        self.backend = backend
+        self.journal_path = journal_path
+        self.compact_every = compact_every
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._pending = {}  # username -> events not yet compacted, oldest first
+        self._seq = 0
+        self._generation = 0
+        self._queue = queue.Queue()
+
+        self._recover()
+        self._file = open(journal_path, "a", encoding="utf-8")
+        self._written = []  # journaled events awaiting compaction (writer thread only)
+        self._writer = threading.Thread(target=self._run, name="storage-journal", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _recover(self):
+        # Fold the journal of an earlier process into the snapshot; a torn last line is dropped
+        if not os.path.exists(self.journal_path):
+            return
+        events = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    break
+        if events:
+            self.backend.apply_events(events)
+        open(self.journal_path, "w").close()
+
+    def _record(self, op, username, restaurant, review=None):
+        event = {"op": op, "user": username, "restaurant": restaurant}
+        if review is not None:
+            event["review"] = copy.deepcopy(review)
+        # Queued under the lock, so the journal is written in sequence order
+        with self._lock:
+            self._seq += 1
+            event["seq"] = self._seq
+            self._pending.setdefault(username, []).append(event)
+            self._queue.put(event)
+
+    def _read(self, username, read_snapshot, review_events):
+        # The snapshot read must not overlap a compaction, or events folded into it
+        # after the pending list was taken could be undone by older pending ones.
+        # `_generation` is odd while a compaction runs (a seqlock).
+        while True:
+            with self._lock:
+                generation = self._generation
+                events = list(self._pending.get(username, ()))
+            if generation % 2:
+                time.sleep(0.001)
+                continue
+            state = read_snapshot(username)
+            if self._generation == generation:
+                break
+        for event in events:
+            if (event["op"] == "save_review") == review_events:
+                apply_event(event, reviews=state) if review_events else apply_event(event, bookmarks=state)
+        return state
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.idle_seconds)]
+            except queue.Empty:
+                if self._written:
+                    self.compact()
+                continue
+            while len(batch) < JOURNAL_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            events = [event for event in batch if event is not None]
+            if events:
+                self._file.write("".join(json.dumps(event) + "\n" for event in events))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._written.extend(events)
+            if stop or len(self._written) >= self.compact_every:
+                self.compact()
+            if stop:
+                return
+
+    def compact(self):
+        """Apply the journaled events to the wrapped backend and truncate the journal (writer thread only)."""
+        if not self._written:
+            return
+        with self._lock:
+            self._generation += 1
+        try:
+            self.backend.apply_events(self._written)
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            # Only the events actually applied leave the pending lists
+            compacted = {event["seq"] for event in self._written}
+            self._written = []
+            with self._lock:
+                for username in list(self._pending):
+                    events = [event for event in self._pending[username] if event["seq"] not in compacted]
+                    if events:
+                        self._pending[username] = events
+                    else:
+                        del self._pending[username]
+        finally:
+            with self._lock:
+                self._generation += 1
+
+    def close(self):
+        """Write and compact every outstanding event, then stop the writer."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+            self._file.close()
+
+    def bookmarks(self, username):
+        return self._read(username, self.backend.bookmarks, review_events=False)
+
+    def add_bookmark(self, username, restaurant):
+        self._record("add_bookmark", username, restaurant)
+
+    def remove_bookmark(self, username, restaurant):
+        self._record("remove_bookmark", username, restaurant)
+
+    def reviews(self, username):
+        return self._read(username, self.backend.reviews, review_events=True)
+
+    def save_review(self, username, restaurant, review):
+        self._record("save_review", username, restaurant, review)
+
+    def profile(self, username):
+        return self.backend.profile(username)
+
+    def save_profile(self, username, profile):
+        self.backend.save_profile(username, profile)
+
+    def password_hash(self, username):
+        return self.backend.password_hash(username)
+
+    def set_password_hash(self, username, hashed):
+        self.backend.set_password_hash(username, hashed)
+
+
+def migrate_json(json_backend, sqlite_backend):
+    """Copy every record of a JsonBackend into a SqliteBackend; returns the record counts."""
+    passwords = dict(json_backend.passwords_store.items())
+    profiles = dict(json_backend.profiles_store.items())
+    bookmarks = dict(json_backend.bookmarks_store.items())
+    reviews = dict(json_backend.reviews_store.items())
+    sqlite_backend.import_records(passwords, profiles, bookmarks, reviews)
+    return {
+        "passwords": len(passwords),
+        "profiles": len(profiles),
+        "bookmarks": sum(len(names) for names in bookmarks.values()),
+        "reviews": sum(len(user_reviews) for user_reviews in reviews.values()),
+    }
+
+
+def open_backend(data_files, db_path, kind=None, default_users=()):
+    """
+    The storage backend named by `kind` ('json' or 'sqlite', defaulting to the
+    STORAGE_BACKEND environment variable, then 'sqlite'). A SQLite database
+    that does not exist yet is created and filled from the JSON files once.
+    """
+    kind = (kind or os.environ.get("STORAGE_BACKEND", "sqlite")).lower()
+    if kind == "json":
+        return JsonBackend(data_files, default_users)
+    if kind != "sqlite":
+        raise ValueError(f"Unknown storage backend: {kind}")
+
+    if os.path.exists(db_path):
+        return SqliteBackend(db_path)
+    # Build the new database next to its final path so a failed migration leaves nothing behind
+    tmp_path = db_path + ".tmp"
+    for path in (tmp_path, tmp_path + "-wal", tmp_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    backend = SqliteBackend(tmp_path)
+    migrate_json(JsonBackend(data_files, default_users), backend)
+    with backend._connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    backend.close()
+    os.replace(tmp_path, db_path)
+    return SqliteBackend(db_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrate the JSON user stores into SQLite.")
+    parser.add_argument("--data", default="data/", help="folder holding the JSON files")
+    parser.add_argument("--db", default=None, help="database path (default: <data>/user_data.sqlite3)")
+    args = parser.parse_args()
+
+    data_files = {
+        "BOOKMARK_FILE": os.path.join(args.data, "bookmarked_restaurants.json"),
+        "PASSWORDS_FILE": os.path.join(args.data, "user_passwords.json"),
+        "USER_PROFILES_FILE": os.path.join(args.data, "user_profiles.json"),
+        "REVIEWS_FILE": os.path.join(args.data, "restaurant_reviews.json"),
+    }
+    db_path = args.db or os.path.join(args.data, "user_data.sqlite3")
+    counts = migrate_json(JsonBackend(data_files), SqliteBackend(db_path))
+    print(f"Migrated into {db_path}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))